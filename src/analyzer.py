@@ -11,32 +11,124 @@
     Main Features:
     - Initializes with a configurator and command caller.
     - Prepares data by performing sequence alignment, grouping reads,
-    and recalibration.
+    and recalibration. Alignments are piped into read grouping
+    without an intermediate SAM file.
     - Analyzes samples by calling variants, annotating them,
     converting formats, and generating reports.
     - Manages paths, logs, and subprocess execution.
+    - Runs batches of samples concurrently in a process pool,
+    optionally staggering them so only some are aligned at once.
 """
 
 # region Imports
 import os
-
-from typing import Union, Protocol
+import shlex
+import shutil
+import logging
+import subprocess
+import multiprocessing
+import multiprocessing.synchronize
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from contextlib import AbstractContextManager
+from contextlib import nullcontext
+from typing import Union, Protocol, Optional, Iterable
 
 from src.core.base import CommandExecutor
 from src.core.base import execute
+from src.core.base import execute_pipeline
+from src.core.base import insert_processing_infix
+from src.core.base import outputs_exist
+from src.core.jvm_server import NailgunServer
+from src.core.jvm_server import nailgun_enabled
 
 from src.configurator import Configurator
+from src.core.configurator.configuration_error import ConfigurationError
 
 from src.core.sample_data_container import SampleDataContainer
+from src.utils.util import reg_tuple_map
+from src.utils.util import write_regions_bed
 
 from src.core.analyzer.bam_grouper import BamGrouper
 from src.core.analyzer.bqsr_performer import BQSRPerformer
+from src.core.analyzer.primer_cutter import Fastp
+from src.core.analyzer.primer_cutter import PTrimmer
+from src.core.analyzer.primer_cutter import CutPrimers
 from src.core.analyzer.primer_cutter import PrimerCutter
-from src.core.analyzer.sequence_aligner import SequenceAligner, BWAAligner
+from src.core.analyzer.sequence_aligner import BWAAligner
+from src.core.analyzer.sequence_aligner import SequenceAligner
 from src.core.analyzer.annotation_adapter import SnpEffAnnotationAdapter
 from src.core.analyzer.variant_caller_factory import VariantCallerFactory
 # endregion
 
+__all__ = ['Analyzer', 'BRCAAnalyzer']
+
+
+# Limits the samples aligned at once by the workers of a batch,
+# set in every worker process by '_init_worker'
+_alignment_slots = None
+
+
+def _init_worker(
+    configurator: Configurator,
+    alignment_slots: Optional[multiprocessing.synchronize.Semaphore] = None
+) -> None:
+    """Restores the configurator singleton inside a pool worker process.
+
+        Args:
+            configurator (Configurator):
+                The configurator instance pickled from the parent process.
+            alignment_slots (multiprocessing.synchronize.Semaphore, optional):
+                Semaphore shared by the workers, see '_alignment_slot'.
+    """
+    global _alignment_slots
+    _alignment_slots = alignment_slots
+
+    Configurator.set_instance(configurator)
+
+    if not logging.getLogger().handlers:
+        Configurator._setup_logger(
+            log_filename=configurator.args.logFilename,
+            args=configurator.args)
+
+
+def _alignment_slot() -> AbstractContextManager:
+    """Waits for one of the alignment slots of the batch.
+
+        Only the stages using every thread given to them
+        (trimming, alignment and sorting) hold the slot, so the other
+        workers recalibrate their samples meanwhile instead of
+        competing for the CPUs.
+
+        Returns:
+            AbstractContextManager:
+                The slot, held while the context is entered.
+                A no-op outside a batch without slots.
+    """
+    return _alignment_slots if _alignment_slots is not None \
+        else nullcontext()
+
+
+def _prepare_sample(
+    analyzer: 'Analyzer',
+    sample: SampleDataContainer
+) -> SampleDataContainer:
+    """Runs the per-sample data preparation inside a pool worker process.
+
+        Args:
+            analyzer (Analyzer):
+                The analyzer instance pickled from the parent process.
+            sample (SampleDataContainer):
+                Sample to prepare.
+
+        Returns:
+            SampleDataContainer:
+                The prepared sample.
+    """
+    return analyzer.prepare_data(sample)
+
 
 class Analyzer(Protocol):
     """Protocol class for design your own analyze stage that manages \
@@ -62,6 +154,11 @@ class Analyzer(Protocol):
             analyze(sample):
                 Performs variant calling, annotation,
                 and converts formats for reporting.
+            analyze_cohort(samples):
+                Performs analyze for several samples at once.
+            run_batch(samples, max_workers):
+                Runs prepare_data for several samples concurrently,
+                then analyzes them as a cohort.
     """
 
     def __init__(
@@ -75,10 +172,10 @@ class Analyzer(Protocol):
             self.cmd_caller = cmd_caller
 
         elif callable(cmd_caller):
-            self.cmd_caller = CommandExecutor(cmd_caller)
+            self.cmd_caller = CommandExecutor(cmd_caller, configurator.logger)
 
         elif cmd_caller is None:
-            self.cmd_caller = os.system
+            self.cmd_caller = CommandExecutor(logger=configurator.logger)
 
         else:
             raise TypeError(
@@ -86,6 +183,12 @@ class Analyzer(Protocol):
                 f"'{type(cmd_caller)}' given"
             )
 
+        # Regions are static configuration, so they are resolved
+        # once here instead of parsing the config file for every sample
+        self._target_regions = reg_tuple_map(configurator)
+        # Written by the first stage that needs it
+        self._intervals_bed = None
+
     def prepare_data(self, sample: SampleDataContainer) -> SampleDataContainer:
         """Prepares raw sequencing data for analysis, including alignment,
             read grouping, and recalibration.
@@ -113,6 +216,187 @@ class Analyzer(Protocol):
         """
         raise NotImplementedError
 
+    def _ensure_sample_dirs(self, sample: SampleDataContainer) -> None:
+        """Creates every directory the stages write the sample's files to.
+
+            Stages expect the sample's processing and log directories
+            to exist, so they are created once here
+            instead of being checked by every stage.
+
+            Args:
+                sample (SampleDataContainer):
+                    Sample whose directories are created.
+        """
+        for dirpath in (sample.processing_path, sample.processing_logpath):
+            os.makedirs(dirpath, exist_ok=True)
+
+    def _ensure_intervals_bed(self) -> str:
+        """Writes the target regions to a BED file if it isn't written yet.
+
+            Returns:
+                str:
+                    Path to the BED file with the target regions.
+        """
+        if self._intervals_bed is None:
+            self._intervals_bed = write_regions_bed(
+                self.configurator,
+                os.path.join(self.configurator.output_dir, 'intervals.bed'),
+                reference_index=self.configurator.config['reference']+'.fai'
+            )
+
+        return self._intervals_bed
+
+    def _dump_bam_header(self, sample: SampleDataContainer) -> str:
+        """Writes the header of the sample's BAM file to a small SAM file.
+
+            Args:
+                sample (SampleDataContainer):
+                    Sample with a BAM file.
+
+            Returns:
+                str:
+                    Path to the header-only SAM file.
+        """
+        header_filepath = sample.paths.header_sam
+
+        execute(self.cmd_caller, [
+            self.configurator.config['samtools'], 'view', '-H',
+            sample.bam_filepath, '-o', header_filepath], check=True)
+
+        return header_filepath
+
+    def analyze_cohort(
+        self,
+        samples: list[SampleDataContainer]
+    ) -> list[SampleDataContainer]:
+        """Performs variant calling, annotation, and format conversion
+            for several samples.
+
+            Analyzes the samples one by one, implementations may override
+            it to run a tool once for the whole cohort.
+
+            Args:
+                samples (list[SampleDataContainer]):
+                    Samples with aligned data.
+
+            Returns:
+                list[SampleDataContainer]:
+                    Updated samples with annotated variants and reports.
+        """
+        return [self.analyze(sample) for sample in samples]
+
+    def _allot_threads(
+        self,
+        threads: int,
+        workers: int = 1,
+        max_workers: int = 1
+    ) -> None:
+        """Sets the number of threads every multithreaded stage may use.
+
+            Does nothing by default, implementations with stages
+            built once pass the number on to them.
+
+            Args:
+                threads (int):
+                    Number of threads per tool.
+                workers (int, optional):
+                    Number of samples aligned simultaneously.
+                max_workers (int, optional):
+                    Number of samples processed simultaneously.
+        """
+
+    def run_batch(
+        self,
+        samples: Iterable[SampleDataContainer],
+        max_workers: Optional[int] = None
+    ) -> list[SampleDataContainer]:
+        """Runs prepare_data for a batch of samples in a pool
+            of worker processes, then analyzes them as a cohort.
+
+            Samples are independent from each other, so each one
+            is prepared in its own process.
+            The default pool size keeps the total amount
+            of tool threads (workers * threads) within the CPU count.
+            Otherwise the tools get the CPUs left per worker,
+            see '_allot_threads'.
+
+            Args:
+                samples (Iterable[SampleDataContainer]):
+                    Samples with raw data and metadata,
+                    e.g. a generator parsing a sample list.
+                max_workers (int, optional):
+                    Number of samples processed simultaneously.
+                    Defaults to CPU count divided by threads per tool.
+
+            Returns:
+                list[SampleDataContainer]:
+                    Processed samples in the order of their completion.
+        """
+        samples = list(samples)
+        if not samples:
+            return []
+
+        cpu_count = os.cpu_count() or 1
+
+        if max_workers is None:
+            max_workers = max(
+                1, cpu_count // max(1, self.configurator.args.threads))
+        elif max_workers > cpu_count:
+            self.configurator.logger.warning(
+                "%s samples in parallel oversubscribe %s CPUs",
+                max_workers, cpu_count)
+
+        max_workers = max(1, min(max_workers, len(samples)))
+
+        # With fewer slots than workers the samples are staggered:
+        # some of them are aligned with all the CPUs,
+        # while the others are recalibrated
+        slots = int(self.configurator.parse_optional_configuration(
+            'Alignment', defaults={'concurrent-samples': '0'}
+        )['concurrent-samples'])
+        aligned_at_once = min(slots, max_workers) if slots > 0 \
+            else max_workers
+
+        threads_per_stage = max(1, cpu_count // aligned_at_once)
+
+        # Workers get pickled copies of the stages,
+        # so the threads have to be set before submitting
+        self._allot_threads(threads_per_stage, aligned_at_once, max_workers)
+
+        self.configurator.logger.info(
+            "Starting to process %s samples with %s workers, "
+            "%s of them aligned at once, %s threads per tool",
+            len(samples), max_workers, aligned_at_once, threads_per_stage)
+
+        prepared_samples = []
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=_init_worker,
+            initargs=(
+                self.configurator,
+                multiprocessing.Semaphore(aligned_at_once)
+                if aligned_at_once < max_workers else None)
+        ) as pool:
+            futures = {
+                pool.submit(_prepare_sample, self, sample): sample
+                for sample in samples}
+
+            for future in as_completed(futures):
+                try:
+                    prepared_samples.append(future.result())
+
+                # A stage may still end the worker with 'sys.exit',
+                # which isn't an Exception, but must stop the batch too
+                except BaseException as e:
+                    self.configurator.logger.critical(
+                        "Sample '%s' processing failed: '%s'",
+                        futures[future].sid, repr(e))
+
+                    pool.shutdown(cancel_futures=True)
+                    raise e
+
+        return self.analyze_cohort(prepared_samples)
+
     def __repr__(self):
         return ''.join([
             f"{self.__class__}(configurator={self.configurator.__repr__()}, "
@@ -143,6 +427,9 @@ class BRCAAnalyzer(Analyzer):
             analyze(sample):
                 Performs variant calling, annotation,
                 and converts formats for reporting.
+            analyze_cohort(samples):
+                Calls variants of all samples in one variant caller run
+                and annotates them.
     """
 
     def __init__(
@@ -150,22 +437,162 @@ class BRCAAnalyzer(Analyzer):
         configurator: Configurator,
         cmd_caller: Union[CommandExecutor, callable] = None
     ):
-        self.configurator = configurator
+        super().__init__(configurator, cmd_caller)
+
+        alignment = configurator.parse_optional_configuration(
+            'Alignment', defaults={
+                'aligner': 'bwa',
+                'shared-memory-index': 'False'})
+
+        # Stages hold nothing but the configuration,
+        # so one set of them serves every sample
+        self._ptrimmer = PrimerCutter.create_primer_cutter(
+            configurator=configurator,
+            cutter_name=PrimerCutter.default_cutter_name(configurator)
+        )
+        self._aligner = (
+            SequenceAligner(configurator)
+            if alignment['aligner'].lower() == 'bwa-mem2'
+            else BWAAligner(configurator))
+        self._grouper = BamGrouper(configurator)
+        self._bqsr = BQSRPerformer(configurator)
+
+        self._variant_caller = VariantCallerFactory.create_caller(
+            caller_config={'name': 'pisces'}, configurator=configurator
+        )
+        self._snpeff = SnpEffAnnotationAdapter(configurator)
+
+        # Only fastp can write trimmed pairs to a pipe
+        self._stream_trimmed_reads = isinstance(self._ptrimmer, Fastp)
+        # Only the classic BWA can keep its index in shared memory
+        self._shared_index = isinstance(self._aligner, BWAAligner) and \
+            alignment['shared-memory-index'].lower() in ('true', 'yes', '1')
+        self._aligner_index_ready = False
+
+        # A custom command caller may run the tools elsewhere,
+        # so only the tools run on this host are checked
+        if self.cmd_caller.caller is None:
+            self._check_tools()
+
+    def _check_tools(self) -> None:
+        """Checks every tool and data file the configured stages use
+            before any sample is processed, so a misconfigured path
+            fails the run at once instead of after hours of work.
+
+            Raises:
+                ConfigurationError:
+                    If any of the paths is missing or not executable.
+        """
+        config = self.configurator.config
+
+        # (executables, files) of every primer cutter
+        primer_cutter_keys = {
+            Fastp: (
+                ['fastp'], ['primer15', 'primer13', 'primer25', 'primer23']),
+            PTrimmer: (['ptrimmer'], ['ampfile']),
+            CutPrimers: (['python'], ['cutprimers'])}
+        cutter_executables, cutter_files = primer_cutter_keys.get(
+            type(self._ptrimmer), ([], []))
+
+        executable_keys = [
+            'java', 'samtools', 'gatk', 'pisces',
+            'convert2annovar', 'table_annovar',
+            self._aligner.aligner_key, *cutter_executables]
+        file_keys = [
+            'reference', 'snpeff', 'annovar_humandb', *cutter_files]
+
+        problems = [
+            f"'{key}' isn't set" if not config.get(key)
+            else f"'{key}' = '{config[key]}' isn't an executable"
+            for key in executable_keys
+            if not config.get(key) or shutil.which(config[key]) is None]
+        problems.extend(
+            f"'{key}' isn't set" if not config.get(key)
+            else f"'{key}' = '{config[key]}' doesn't exist"
+            for key in file_keys
+            if not config.get(key) or not os.path.exists(config[key]))
+
+        if problems:
+            for problem in problems:
+                self.configurator.logger.critical(
+                    "Tool check failed: %s", problem)
+            raise ConfigurationError(
+                "Tools are misconfigured: " + '; '.join(problems))
+
+    def run_batch(
+        self,
+        samples: Iterable[SampleDataContainer],
+        max_workers: Optional[int] = None
+    ) -> list[SampleDataContainer]:
+        """Runs the batch like 'Analyzer.run_batch', with the aligner's
+            reference index kept in shared memory for the whole batch
+            if 'shared-memory-index' is enabled in the 'Alignment' section,
+            and with Java tools served by one Nailgun server
+            if it is configured (see 'src.core.jvm_server').
+        """
+        samples = list(samples)
+        if not samples:
+            return super().run_batch(samples, max_workers)
+
+        # Indexed and written once here,
+        # so concurrent workers don't build them
+        self._ensure_aligner_index()
+        self._ensure_intervals_bed()
+        if isinstance(self._ptrimmer, Fastp):
+            self._ptrimmer.primer_argv()
+
+        with ExitStack() as stack:
+            if self._shared_index:
+                self._aligner.load_shared_index(
+                    self.configurator.config['reference'], self.cmd_caller)
+                stack.callback(
+                    self._aligner.drop_shared_index, self.cmd_caller)
+
+            if nailgun_enabled(self.configurator):
+                stack.enter_context(
+                    NailgunServer(self.configurator, self.cmd_caller))
+
+            return super().run_batch(samples, max_workers)
+
+    def _ensure_aligner_index(self) -> None:
+        """Builds the aligner's reference index if it is missing.
+
+            The result is remembered, so the index files
+            aren't checked again for every sample.
+        """
+        if self._aligner_index_ready:
+            return
 
-        if isinstance(cmd_caller, CommandExecutor):
-            self.cmd_caller = cmd_caller
+        self._aligner.ensure_index(
+            self.configurator.config['reference'], self.cmd_caller)
+        self._aligner_index_ready = True
 
-        elif callable(cmd_caller):
-            self.cmd_caller = CommandExecutor(cmd_caller)
+    def _allot_threads(
+        self,
+        threads: int,
+        workers: int = 1,
+        max_workers: int = 1
+    ) -> None:
+        """Passes the number of threads to the stages run per sample.
+            The sorting memory is shared by the samples sorted at once,
+            '/dev/shm' by the samples which may be recalibrated at once.
 
-        elif cmd_caller is None:
-            self.cmd_caller = os.system
+            Args:
+                threads (int):
+                    Number of threads per tool.
+                workers (int, optional):
+                    Number of samples aligned simultaneously.
+                max_workers (int, optional):
+                    Number of samples processed simultaneously.
+        """
+        for stage in (self._ptrimmer, self._aligner, self._grouper):
+            if hasattr(stage, 'threads'):
+                stage.threads = threads
 
-        else:
-            raise TypeError(
-                "Command caller must be callable, "
-                f"'{type(cmd_caller)}' given"
-            )
+        self._grouper.workers = workers
+        # Staggered workers recalibrate while others align,
+        # so every worker may be recalibrating at once
+        self._bqsr.workers = max_workers
 
     def prepare_data(
         self,
@@ -182,43 +609,112 @@ class BRCAAnalyzer(Analyzer):
                 SampleDataContainer:
                     Updated sample with paths to intermediate and final files.
         """
-        bwa_aligner = BWAAligner(self.configurator)
-        # TODO: picard BuildBamIndex      Generates a BAM index ".bai" file.
-        picard_group_reads = BamGrouper(self.configurator)
+        self._ensure_sample_dirs(sample)
+        self._ensure_aligner_index()
 
-        ptrimmer = PrimerCutter.create_primer_cutter(
-            configurator=self.configurator,
-            cutter_name='ptrimmer'
-        )
+        # Trimming, alignment and grouping run as a single pipeline,
+        # so they are skipped together if a previous run
+        # has left the indexed sorted alignments
+        grouped_paths = self._grouper.output_paths(sample)
 
-        sample.r1_source, sample.r2_source = ptrimmer.perform(
-            sample, executor=self.cmd_caller
-        )
+        if outputs_exist(*grouped_paths):
+            self.configurator.logger.info(
+                "Sorted alignments '%s' already exist, skipping trimming, "
+                "alignment and grouping", grouped_paths[1])
+            _, sample.bam_filepath = grouped_paths
 
-        sample.bam_filepath = bwa_aligner.perform(
-            sample,
-            self.configurator.config['reference'],
-            executor=self.cmd_caller
-        )
+        else:
+            with _alignment_slot():
+                self._trim_align_group(sample)
 
         sample.parse_regions(
             configurator=self.configurator,
-            logger=self.configurator.logger
+            path=self._dump_bam_header(sample),
+            logger=self.configurator.logger,
+            regions=self._target_regions
         )
 
-        bam_index_filepath, sample.bam_filepath = picard_group_reads.perform(
-            sample, executor=self.cmd_caller
+        sample.bam_filepath = self._bqsr.perform(
+            sample, executor=self.cmd_caller,
+            intervals=self._ensure_intervals_bed()
         )
 
-        gatk4_bqsr = BQSRPerformer(self.configurator)
+        return sample
 
-        sample.bam_filepath = gatk4_bqsr.perform(
-            sample, executor=self.cmd_caller
+    def _trim_align_group(self, sample: SampleDataContainer) -> None:
+        """Trims primers, aligns the reads and sorts the alignments
+            into the sample's BAM file.
+
+            Args:
+                sample (SampleDataContainer):
+                    Sample with raw reads, its BAM file path is set.
+        """
+        if self._stream_trimmed_reads:
+            # Trimmed pairs are piped into the aligner,
+            # so the trimmed FASTQ files are never written to the disk
+            upstream, upstream_stderr = self._trim_and_align(sample)
+
+        else:
+            sample.r1_source, sample.r2_source = self._ptrimmer.perform(
+                sample, executor=self.cmd_caller
+            )
+
+            upstream, upstream_stderr = self._align(sample)
+
+        # Alignments are streamed straight into samtools,
+        # so the SAM file is never written to the disk.
+        # The aligner adds the read group itself
+        _, sample.bam_filepath = self._grouper.perform(
+            sample, executor=self.cmd_caller,
+            upstream=upstream, upstream_stderr=upstream_stderr,
+            upstream_read_group=True
         )
 
-        os.rename(bam_index_filepath, sample.bam_filepath+".bai")
+    def _trim_and_align(
+        self,
+        sample: SampleDataContainer
+    ) -> tuple[list[list[str]], list[Optional[str]]]:
+        """Builds the commands trimming primers with fastp
+            and aligning the interleaved pairs it writes to stdout.
 
-        return sample
+            Args:
+                sample (SampleDataContainer):
+                    Sample with raw reads.
+
+            Returns:
+                tuple[list[list[str]], list[Optional[str]]]:
+                    The commands writing the alignments to stdout
+                    and their stderr log paths.
+        """
+        return (
+            [
+                self._ptrimmer.build_argv(sample),
+                self._aligner.build_argv(
+                    sample, self.configurator.config['reference'],
+                    reads=('-', None), interleaved=True)
+            ],
+            [self._ptrimmer.logpath(sample), self._aligner.logpath(sample)])
+
+    def _align(
+        self,
+        sample: SampleDataContainer
+    ) -> tuple[list[list[str]], list[Optional[str]]]:
+        """Builds the command streaming the sample's alignments,
+            tagged with the sample's read group, to stdout.
+
+            Args:
+                sample (SampleDataContainer):
+                    Sample with trimmed reads.
+
+            Returns:
+                tuple[list[list[str]], list[Optional[str]]]:
+                    The command writing the alignments to stdout
+                    and its stderr log path.
+        """
+        return (
+            [self._aligner.build_argv(
+                sample, self.configurator.config['reference'])],
+            [self._aligner.logpath(sample)])
 
     def analyze(
         self, sample: SampleDataContainer
@@ -233,212 +729,142 @@ class BRCAAnalyzer(Analyzer):
                 SampleDataContainer:
                     Updated sample with annotated variants and reports.
         """
-        pisces_variant_caller = VariantCallerFactory.create_caller(
-            caller_config={'name': 'pisces'}, configurator=self.configurator
-        )
-
-        snpeff = SnpEffAnnotationAdapter(self.configurator)
-
-        sample.vcf_filepath = pisces_variant_caller.call_variant(
+        sample.vcf_filepath = self._variant_caller.call_variant(
             sample, executor=self.cmd_caller
         )
 
-        annotated_sample_filepath = snpeff.annotate(
-            sample=sample,
-            reference_ident='hg19',
-            executor=self.cmd_caller
-        )
-
-        convert2annovar_logpath = \
-            os.path.join(sample.processing_logpath, "convert2annovar.log")
-
-        outpath = annotated_sample_filepath+'.avinput'
-
-        convert2annovar_cmd = ' '.join([
-            self.configurator.config['convert2annovar'],
-            '-format', 'vcf4',
-            '-includeinfo',
-            # '-allsample',
-            '-withfreq',
-            '2>', convert2annovar_logpath,
-            annotated_sample_filepath,
-            '>', outpath
-        ])
-
-        self.configurator.logger.info("Starting to execute convert2annovar")
-        self.configurator.logger.debug("Command: %s", convert2annovar_cmd)
-
-        execute(self.cmd_caller, convert2annovar_cmd)
-
-        self.configurator.logger.info(
-            "Convertion to avinput format successfully done. "
-            "See it's output on %s", outpath
-        )
-
-        table_annovar_logpath = \
-            os.path.join(sample.processing_logpath, "table_annovar.log")
-
-        table_annovar_cmd = ' '.join([
-            self.configurator.config['table_annovar'],
-            '--buildver', 'hg19',
-            '--operation', ','.join(['g', 'f', 'f']),  #'r']),
-            '--protocol', ','.join([
-                'refGene',
-                'clinvar_20250721',  # 'clinvar_20260226',
-                'ALL.sites.2015_08'  # '1000g2015aug',
-                # 'MANE.GRCh38.v1.5.summary'
-            ]),
-            '--outfile', os.path.join(
-                sample.processing_path, sample.sid+".ann"),
-            '--remove',
-            '--otherinfo',
-            outpath,
-            self.configurator.config['annovar_humandb'],
-            '>', table_annovar_logpath,
-            '2>&1'])
-
-        self.configurator.logger.info(
-            "Starting to execute annotation with table_annovar"
-        )
-
-        self.configurator.logger.debug("Command: %s", table_annovar_cmd)
-
-        execute(self.cmd_caller, table_annovar_cmd)
-
-        annotation_result_filepath = os.path.join(
-            sample.processing_path, sample.sid+".ann.hg19_multianno.csv"
-        )
-
-        self.configurator.logger.info(
-            "Annotation with annovar successfully done. "
-            "See it's output on %s",
-            annotation_result_filepath
-        )
-
-        return sample
-
-    def __repr__(self):
-        return ''.join([
-            f"{self.__class__}(configurator={self.configurator.__repr__()}, "
-            f"cmd_caller={self.cmd_caller.__repr__()}"])
-
-
-class TestAnalyzerhg19(Analyzer):
-    """..."""
-    def prepare_data(self, sample: SampleDataContainer) -> SampleDataContainer:
-        sequence_aligner = BWAAligner(self.configurator)
-
-        primer_trimmer = PrimerCutter.create_primer_cutter(
-            configurator=self.configurator, cutter_name='ptrimmer'
-        )
+        return self._annotate(sample)
 
-        sample.r1_source, sample.r2_source = primer_trimmer.perform(
-            sample, executor=self.cmd_caller
-        )
+    def analyze_cohort(
+        self,
+        samples: list[SampleDataContainer]
+    ) -> list[SampleDataContainer]:
+        """Performs variant calling for all samples within a single
+            variant caller run, then annotates the samples concurrently.
 
-        sample.bam_filepath = sequence_aligner.perform(
-            sample, self.configurator.config['reference'], os.system
-        )
+            SnpEff and ANNOVAR have no way to take several jobs over one
+            long-running process, so their start-up (mostly loading the
+            SnpEff database) is overlapped between samples instead.
+            Concurrency is limited like in 'run_batch'.
 
-        sample.parse_regions(
-            configurator=self.configurator,
-            logger=self.configurator.logger
-        )
+            Args:
+                samples (list[SampleDataContainer]):
+                    Samples with aligned data.
 
-        picard_group_reads = BamGrouper(self.configurator)
+            Returns:
+                list[SampleDataContainer]:
+                    Updated samples with annotated variants and reports.
+        """
+        if not samples:
+            return []
 
-        bam_index_filepath, sample.bam_filepath = picard_group_reads.perform(
-            sample, executor=self.cmd_caller
+        vcf_filepaths = self._variant_caller.call_variants(
+            samples, executor=self.cmd_caller
         )
 
-        gatk4_bqsr = BQSRPerformer(self.configurator)
-
-        sample.bam_filepath = gatk4_bqsr.perform(
-            sample, executor=self.cmd_caller
-        )
+        for sample, vcf_filepath in zip(samples, vcf_filepaths):
+            sample.vcf_filepath = vcf_filepath
 
-        os.rename(bam_index_filepath, sample.bam_filepath+".bai")
+        max_workers = max(1, min(
+            len(samples),
+            (os.cpu_count() or 1) // max(1, self.configurator.args.threads)))
 
-        return sample
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            return list(pool.map(self._annotate, samples))
 
-    def analyze(self, sample: SampleDataContainer) -> SampleDataContainer:
-        pisces_variant_caller = VariantCallerFactory.create_caller(
-            caller_config={'name': 'pisces'}, configurator=self.configurator
-        )
+    def _annotate(
+        self, sample: SampleDataContainer
+    ) -> SampleDataContainer:
+        """Annotates called variants with SnpEff and ANNOVAR.
 
-        snpeff = SnpEffAnnotationAdapter(self.configurator)
+            Args:
+                sample (SampleDataContainer):
+                    Sample with called variants.
 
-        sample.vcf_filepath = pisces_variant_caller.call_variant(
-            sample, executor=self.cmd_caller
-        )
+            Returns:
+                SampleDataContainer:
+                    Updated sample with annotated variants.
+        """
+        config = self.configurator.config
 
-        annotated_sample_filepath = sample.vcf_filepath
-        snpeff.annotate(sample, 'hg19', executor=self.cmd_caller)
+        annotated_sample_filepath = insert_processing_infix(
+            '.ann', sample.vcf_filepath)
 
-        convert2annovar_logpath = \
-            os.path.join(sample.processing_logpath, "convert2annovar.log")
+        convert2annovar_logpath = sample.paths.convert2annovar_log
 
         outpath = annotated_sample_filepath+'.avinput'
 
-        convert2annovar_cmd = ' '.join([
-            self.configurator.config['convert2annovar'],
+        convert2annovar_cmd = [
+            config['convert2annovar'],
             '-format', 'vcf4',
             '-includeinfo',
             # '-allsample',
             '-withfreq',
-            '2>', convert2annovar_logpath,
-            annotated_sample_filepath,
-            '>', outpath
-        ])
-
-        self.configurator.logger.info("Starting to execute convert2annovar")
-        self.configurator.logger.debug("Command: %s", convert2annovar_cmd)
-
-        execute(self.cmd_caller, convert2annovar_cmd)
+            '/dev/stdin']
 
         self.configurator.logger.info(
-            "Convertion to avinput format successfully done. "
-            "See it's output on %s", outpath
-        )
-
-        table_annovar_logpath = os.path.join(
-            sample.processing_logpath, "table_annovar.log"
-        )
-
-        table_annovar_cmd = ' '.join([
-            self.configurator.config['table_annovar'],
+            "Starting to execute SnpEff annotation piped into convert2annovar")
+        if self.configurator.logger.isEnabledFor(logging.DEBUG):
+            self.configurator.logger.debug(
+                "Command: %s", shlex.join(convert2annovar_cmd))
+
+        # The annotated VCF is streamed straight into convert2annovar,
+        # so it is never written to the disk. table_annovar reads its
+        # input once per protocol, so the avinput has to stay a file
+        execute_pipeline(
+            self.cmd_caller,
+            [
+                self._snpeff.build_command(sample, reference_ident='hg19'),
+                convert2annovar_cmd
+            ],
+            stdout=outpath, stderr=[None, convert2annovar_logpath],
+            check=True)
+
+        table_annovar_logpath = sample.paths.table_annovar_log
+
+        table_annovar_cmd = [
+            config['table_annovar'],
             '--buildver', 'hg19',
-            '--operation', ','.join(['g', 'f', 'f']),  # 'f', 'r']),
+            '--operation', ','.join(['g', 'f', 'f']),  #'r']),
             '--protocol', ','.join([
                 'refGene',
-                'clinvar_20250721',  # 'clinvar_20260415',
-                'ALL.sites.2015_08',  # '1000g2015aug',
+                'clinvar_20250721',  # 'clinvar_20260226',
+                'ALL.sites.2015_08'  # '1000g2015aug',
+                # 'MANE.GRCh38.v1.5.summary'
             ]),
-            '--outfile', os.path.join(
-                sample.processing_path, sample.sid+".ann"),
+            '--outfile', sample.paths.ann_prefix,
             '--remove',
             '--otherinfo',
             outpath,
-            self.configurator.config['annovar_humandb'],
-            '>', table_annovar_logpath,
-            '2>&1'])
+            config['annovar_humandb']]
 
         self.configurator.logger.info(
-            "Starting to execute annotation with table_annovar")
-        self.configurator.logger.debug(
-            "Command: %s", table_annovar_cmd
+            "Convertion to avinput format successfully done. "
+            "See it's output on %s", outpath
         )
 
-        execute(self.cmd_caller, table_annovar_cmd)
-
-        annotation_result_filepath = os.path.join(
-            sample.processing_path, sample.sid+".ann.hg19_multianno.csv"
+        self.configurator.logger.info(
+            "Starting to execute annotation with table_annovar"
         )
 
+        if self.configurator.logger.isEnabledFor(logging.DEBUG):
+            self.configurator.logger.debug(
+                "Command: %s", shlex.join(table_annovar_cmd))
+
+        execute(
+            self.cmd_caller, table_annovar_cmd,
+            stdout=table_annovar_logpath, stderr=subprocess.STDOUT,
+            check=True)
+
         self.configurator.logger.info(
             "Annotation with annovar successfully done. "
             "See it's output on %s",
-            annotation_result_filepath
+            sample.paths.multianno_txt
         )
 
         return sample
+
+    def __repr__(self):
+        return ''.join([
+            f"{self.__class__}(configurator={self.configurator.__repr__()}, "
+            f"cmd_caller={self.cmd_caller.__repr__()}"])
@@ -31,6 +31,7 @@ from src.core.configurator.path_validator import PathValidator
 from src.core.configurator.argument_parser import ArgumentParser
 from src.core.configurator.config_loader import ConfigLoader
 from src.core.configurator.logging_configurator import LoggingConfigurator
+from src.core.configurator.configuration_error import ConfigurationError
 # endregion
 
 
@@ -65,6 +66,10 @@ class Configurator(metaclass=SingletonMeta):
                 Loads configuration parameters.
             parse_configuration(base_config_filepath, target_section):
                 Loads specific configuration sections.
+            parse_optional_configuration(target_section, defaults):
+                Loads a configuration section which may be absent.
+            sort_memory_per_thread():
+                Computes the memory share of a sorting thread.
     """
 
     def __init__(
@@ -95,6 +100,8 @@ class Configurator(metaclass=SingletonMeta):
 
         self.output_dir = self._setup_output_directory(self.args.outputDir)
 
+        self._config_loader = ConfigLoader(logger=self.logger)
+
         self.config = self.parse_configuration(
             base_config_filepath=self.args.configFilepath,
             target_section='Pathes'
@@ -199,5 +206,78 @@ class Configurator(metaclass=SingletonMeta):
         if base_config_filepath is None:
             base_config_filepath = self.args.configFilepath
 
-        return ConfigLoader(logger=self.logger).load(
+        return self._config_loader.load(
             base_config_filepath, target_section)
+
+    def parse_optional_configuration(
+        self,
+        target_section: AnyStr,
+        defaults: Optional[dict] = None
+    ) -> dict:
+        """Loads a configuration section which may be absent
+            from the configuration file, e.g. tuning options
+            added after the user's config was written.
+
+            Args:
+                target_section (str):
+                    The section within the configuration file to load.
+                defaults (dict, optional):
+                    Values used for the keys missing from the section.
+
+            Returns:
+                dict:
+                    Defaults updated with the section's parameters.
+        """
+        section = dict(defaults or {})
+
+        try:
+            section.update(self.parse_configuration(
+                base_config_filepath=self.args.configFilepath,
+                target_section=target_section))
+
+        except ConfigurationError:
+            self.logger.debug(
+                "Section '%s' is not configured, defaults are used",
+                target_section)
+
+        return section
+
+    def sort_memory_per_thread(self, threads: Optional[int] = None) -> int:
+        """Computes the memory a sorting tool may take per thread,
+            as a share of the available RAM ('memory-fraction'
+            of the 'Sort' section) divided by the number of threads,
+            capped by 'memory-ceiling' of the 'Sort' section.
+
+            The rest of the RAM is left for the buffers the sorting
+            tool allocates above its limit and for the other tools.
+
+            Args:
+                threads (int, optional):
+                    Number of sorting threads running simultaneously,
+                    in all the samples sorted at once.
+                    Defaults to '--threads'.
+
+            Returns:
+                int:
+                    Memory in MiB, not less than 256.
+                    The ceiling, if the available RAM is unknown
+                    (no '/proc/meminfo').
+        """
+        options = self.parse_optional_configuration(
+            'Sort', defaults={
+                'memory-ceiling': '8192', 'memory-fraction': '0.6'})
+        ceiling = int(options['memory-ceiling'])
+
+        try:
+            with open('/proc/meminfo', 'r', encoding='utf-8') as fd:
+                available = next(
+                    int(line.split()[1]) // 1024 for line in fd
+                    if line.startswith('MemAvailable:'))
+
+        except (OSError, StopIteration, ValueError):
+            return ceiling
+
+        return max(256, min(
+            ceiling,
+            int(available * float(options['memory-fraction']))
+            // max(1, threads or self.args.threads)))
@@ -1,6 +1,7 @@
 """This module contains the AdapterTrimmer class,
     which manages the removal of adapter sequences from sequencing
-    reads using the Trimmomatic program.
+    reads using the Trimmomatic program, or fastp if it is chosen
+    by the 'trimmer' option of the 'Pathes' section.
 
     This preprocessing step is crucial for ensuring that primer sequences
     are positioned close to the read ends,
@@ -9,15 +10,18 @@
     Classes:
         - AdapterTrimmer:
         Responsible for executing adapter trimming on sequencing reads.
-        Utilizes Trimmomatic, supports both single-end and paired-end modes,
-        and logs the trimming process.
+        Utilizes Trimmomatic or fastp, supports both single-end
+        and paired-end modes, and logs the trimming process.
 
     Main Features:
         - Validates the existence of input read files.
         - Constructs and executes the Trimmomatic command
         with appropriate parameters.
         - Handles output directories and logging.
-        - Returns paths to the processed, adapter-trimmed read files.
+        - Writes the trimmed reads to '/dev/shm' if it has room for them.
+        - Skips trimming if the trimmed reads are left by a previous run.
+        - Returns paths to the processed, adapter-trimmed read files
+        grouped into paired and unpaired ones.
 
     Dependencies:
         - src.core.base:
@@ -33,21 +37,68 @@
 
 # region Imports
 import os
+import shlex
+import shutil
+import atexit
+import logging
+import tempfile
+import subprocess
 
 from os import PathLike
-from typing import Union, AnyStr
+from concurrent.futures import ThreadPoolExecutor
+from typing import Union, AnyStr, Optional
 
 from src.core.base import LoggerMixin
 from src.core.base import CommandExecutor
 
 from src.core.base import execute
+from src.core.base import outputs_exist
 from src.core.base import insert_processing_infix
+from src.core.jvm_server import java_command
 
 from src.core.sample_data_container import SampleDataContainer
 
 from src.core.analyzer.i_data_preparator import IDataPreparator
 # endregion
 
+# Infixes of the (paired, unpaired) outputs of every input file
+_SUFFIXES = ('.paired', '.unpaired')
+
+_SHM_DIRPATH = '/dev/shm'
+
+# The run's directory in '_SHM_DIRPATH', created on the first use
+_shm_run_dirpath = None
+
+
+def _shm_run_dir() -> Optional[str]:
+    """Returns the run's own directory in '/dev/shm', creating it
+        and registering its removal at exit on the first call.
+
+        Returns:
+            Optional[str]:
+                Path to the directory, None if it can't be created.
+    """
+    global _shm_run_dirpath
+
+    if _shm_run_dirpath is None:
+        try:
+            _shm_run_dirpath = tempfile.mkdtemp(
+                prefix='ngs-analyzer-', dir=_SHM_DIRPATH)
+        except OSError:
+            return None
+
+        atexit.register(shutil.rmtree, _shm_run_dirpath, ignore_errors=True)
+
+    return _shm_run_dirpath
+
+
+def _stat(path: PathLike[AnyStr]) -> Optional[os.stat_result]:
+    """Returns the status of a file, or None if it can't be accessed."""
+    try:
+        return os.stat(path)
+    except OSError:
+        return None
+
 
 class AdapterTrimmer(LoggerMixin, IDataPreparator):
     """The AdapterTrimmer class is responsible for
@@ -61,22 +112,61 @@ class AdapterTrimmer(LoggerMixin, IDataPreparator):
         implementing the data preparation interface.
     """
 
-    def __init__(self, configurator):
+    def __init__(self, configurator, threads: Optional[int] = None):
         """Initializes the AdapterTrimmer with a configuration object.
 
         Args:
             configurator (object):
                 The configuration object containing parameters and settings,
                 including logger, file paths, and Trimmomatic options.
+            threads (int, optional):
+                Number of trimmer threads.
+                Defaults to the '--threads' argument.
         """
         super().__init__(logger=configurator.logger)
         self.configurator = configurator
+        self.threads = threads or configurator.args.threads
+
+        # The sections don't change between samples,
+        # so they are parsed once instead of in every 'perform'
+        self._trimmomatic_args = configurator.parse_optional_configuration(
+            'Trimmomatic')
+        self._fastp_args = configurator.parse_optional_configuration('Fastp')
+        self._compression_level = configurator.parse_optional_configuration(
+            'Compression', defaults={'level': '1'})['level']
+        self._use_fastp = \
+            configurator.config.get('trimmer', 'trimmomatic') == 'fastp'
+
+        # Trimmed reads are read once by the aligner, so they are
+        # kept in RAM if it has room for them. The directory is unique
+        # to the run and is made here, so the workers of a batch
+        # share it, and it is removed when the run is over
+        self._shm_dirpath = _shm_run_dir()
+
+        # The arguments which don't depend on the sample are built once,
+        # 'perform' only adds the mode, the threads and the paths
+        if self._use_fastp:
+            self._fastp_static_args = {
+                paired: [
+                    *(['--adapter_fasta',
+                       os.path.abspath(self._fastp_args['adapters'])]
+                      if 'adapters' in self._fastp_args else []),
+                    *self._fastp_trimming_args(self._fastp_args, paired),
+                    '--compression', self._compression_level]
+                for paired in (False, True)}
+        else:
+            self._trimmomatic_prefix = java_command(
+                configurator, 'trimmomatic')
+            self._trimmomatic_phred = f"-{self._trimmomatic_args['phred']}"
+            self._trimmomatic_steps = self._trimmomatic_step_args()
+            self._trimmomatic_log_basename = os.path.basename(
+                os.path.splitext(configurator.config['trimmomatic'])[0])
 
     def perform(
         self,
         sample: SampleDataContainer,
         executor: Union[CommandExecutor, callable]
-    ) -> list[PathLike[AnyStr]]:
+    ) -> dict[str, tuple[PathLike[AnyStr], ...]]:
         """Executes adapter sequence trimming
             on the provided sequencing sample.
 
@@ -89,108 +179,339 @@ class AdapterTrimmer(LoggerMixin, IDataPreparator):
                     responsible for running system commands.
 
             Returns:
-                list[PathLike[AnyStr]]:
-                    A list of paths to the processed (trimmed) read files,
-                    specifically the paired read files.
+                dict[str, tuple[PathLike[AnyStr], ...]]:
+                    Paths to the processed (trimmed) read files
+                    by kind: 'paired' holds (R1, R2) or (R1,)
+                    for single-end reads, 'unpaired' holds the reads
+                    which lost their mates, empty for single-end reads.
 
             Raises:
                 FileNotFoundError: If any of the input read files are missing.
         """
+        basein = tuple(
+            source for source in (sample.r1_source, sample.r2_source)
+            if source is not None)
+
+        # The inputs are checked concurrently, which hides the latency
+        # of a network filesystem. Their sizes are used below
+        with ThreadPoolExecutor(max_workers=len(basein)) as pool:
+            input_stats = list(pool.map(_stat, basein))
+
+        for mate, source, stat in zip(('R1', 'R2'), basein, input_stats):
+            if stat is None:
+                msg = f"{mate} reads file '{source}' not found. Abort"
+                self.logger.critical(msg)
+                raise FileNotFoundError(msg)
 
-        if not os.path.exists(sample.R1_source):
-            msg = f"R1 reads file '{sample.R1_source}' not found. Abort"
-            self.logger.critical(msg)
-            raise FileNotFoundError(msg)
-
-        trim_outpath = os.path.abspath(os.path.join(
-            sample.processing_path, 'trimmed_reads'))
+        trim_outpath = self._trimmed_reads_dirpath(
+            sample, sum(stat.st_size for stat in input_stats))
+
+        use_fastp = self._use_fastp
+
+        # fastp compresses its output with all its threads,
+        # so its reads are always written gzipped. Trimmomatic
+        # compresses in one thread and keeps the inputs' compression
+        outnames = (
+            os.path.join(trim_outpath, os.path.basename(source))
+            for source in basein)
+        if use_fastp:
+            outnames = (
+                name if name.endswith('.gz') else name+'.gz'
+                for name in outnames)
+
+        # (paired, unpaired) output pair for every input file
+        baseout = tuple(
+            tuple(insert_processing_infix(suffix, base)
+                  for suffix in _SUFFIXES)
+            for base in outnames)
+
+        # Outputs are taken by their position in the pairs,
+        # SE mode writes no unpaired reads
+        paired, unpaired = zip(*baseout)
+        outputs = {
+            'paired': paired,
+            'unpaired': unpaired if len(basein) > 1 else ()}
+
+        # Unpaired outputs may be empty, so only paired ones are checked
+        if outputs_exist(*outputs['paired']):
+            self.logger.info(
+                "Trimmed reads of sample '%s' already exist, "
+                "skipping adapter trimming", sample.sid)
+            return outputs
+
+        # Directories are only created if the trimmer runs
         os.makedirs(trim_outpath, exist_ok=True)
-        os.makedirs(sample.processing_logpath, exist_ok=True)
+        os.makedirs(sample.paths.logdir, exist_ok=True)
+
+        # The trimmer writes the outputs from the start, so it writes
+        # them under temporary names, and only complete outputs
+        # get the names the check above looks for
+        partial_baseout = tuple(
+            tuple(insert_processing_infix('.partial', path) for path in pair)
+            for pair in baseout)
+
+        if use_fastp:
+            trimmer_cmd, trimmer_log_path = self._fastp_command(
+                sample, basein, partial_baseout)
+        else:
+            trimmer_cmd, trimmer_log_path = self._trimmomatic_command(
+                sample, basein, partial_baseout)
+
+        self.logger.info("Starting to trim adapters")
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("Command: %s", shlex.join(trimmer_cmd))
+
+        execute(
+            executor, trimmer_cmd,
+            stdout=trimmer_log_path, stderr=subprocess.STDOUT, check=True)
+
+        # Paired outputs are the checked ones, so they are renamed last
+        for path in (*outputs['unpaired'], *outputs['paired']):
+            os.replace(insert_processing_infix('.partial', path), path)
 
-        trimmer_args = self.configurator.parse_configuration(
-            target_section='Trimmomatic')
+        self.logger.info(
+            "Adapter trimming completed successfully. See the log at '%s'",
+            trimmer_log_path)
 
-        outpathes = [t for t in [insert_processing_infix(
-            infix, os.path.abspath(
-                os.path.join(
-                    trim_outpath,
-                    os.path.basename(sample.R1_source))
-                )
-            ) for infix in ['.paired', '.unpaired']]]
+        return outputs
 
-        if sample.R2_source is None:  # SE
-            trimmer_args.update({
-                'mode': 'SE',
-                'basein': sample.R1_source,
-                'baseout': tuple(outpathes)})
+    def _trimmed_reads_dirpath(
+        self,
+        sample: SampleDataContainer,
+        input_size: int
+    ) -> PathLike[AnyStr]:
+        """Chooses the directory the trimmed reads are written to.
 
-        else:  # PE
-            if not os.path.exists(sample.R2_source):
-                msg = f"R2 reads file '{sample.R2_source}' not found. Abort"
+            A per-run directory in '/dev/shm' is used if its free space
+            is more than twice the size of the input reads,
+            the sample's trimmed reads directory otherwise.
 
-                self.logger.critical(msg)
-                raise FileNotFoundError(msg)
+            Args:
+                sample (SampleDataContainer):
+                    The sample to trim.
+                input_size (int):
+                    Total size of the input read files in bytes.
+
+            Returns:
+                PathLike[AnyStr]:
+                    The directory.
+        """
+        try:
+            if self._shm_dirpath is not None and \
+                    shutil.disk_usage(_SHM_DIRPATH).free > 2 * input_size:
+                return os.path.join(
+                    self._shm_dirpath, sample.sid, 'trimmed_reads')
+        except OSError:
+            pass
+
+        return sample.paths.trimmed_reads_dir
+
+    def release(self, sample: SampleDataContainer) -> None:
+        """Removes the sample's trimmed reads from '/dev/shm'.
+
+            The reads are read once, so the pipeline calls it
+            as soon as the aligner has read them, which frees the RAM
+            for the next samples of the batch. Reads written
+            to the sample's directory are kept.
+
+            Args:
+                sample (SampleDataContainer):
+                    The trimmed sample.
+        """
+        if self._shm_dirpath is not None:
+            shutil.rmtree(
+                os.path.join(self._shm_dirpath, sample.sid),
+                ignore_errors=True)
+
+    def _trimmomatic_command(
+        self,
+        sample: SampleDataContainer,
+        basein: tuple[PathLike[AnyStr], ...],
+        baseout: tuple[tuple[PathLike[AnyStr], PathLike[AnyStr]], ...]
+    ) -> tuple[list[str], PathLike[AnyStr]]:
+        """Builds the Trimmomatic command.
 
-            outpathes.extend(
-                [t for t in [insert_processing_infix(
-                    infix, os.path.abspath(
-                        os.path.join(
-                            trim_outpath,
-                            os.path.basename(sample.R2_source))
-                    )
-                ) for infix in ['.paired', '.unpaired']]])
-
-            trimmer_args.update({
-                'mode': 'PE',
-                'basein': (sample.R1_source, sample.R2_source),
-                'baseout': tuple(outpathes)})
-
-        os.makedirs(os.path.dirname(sample.processing_logpath), exist_ok=True)
-
-        trimmer_logging_basepath = os.path.basename(
-            os.path.splitext(self.configurator.config['trimmomatic'])[0])
-        trimmer_summary_path = os.path.abspath(os.path.join(
-            sample.processing_logpath, trimmer_logging_basepath+'.summary'))
-        trimmer_log_path = os.path.abspath(os.path.join(
-            sample.processing_logpath, trimmer_logging_basepath+'.log'))
-
-        trimmer_cmd = ' '.join([
-            self.configurator.config['java'], '-jar',
-            self.configurator.config['trimmomatic'], trimmer_args['mode'],
-            '-threads', str(self.configurator.args.threads),
-            f"-{trimmer_args['phred']}",
+            Args:
+                sample (SampleDataContainer):
+                    The sample to trim.
+                basein (tuple[PathLike[AnyStr], ...]):
+                    Input read files.
+                baseout (tuple[tuple[PathLike[AnyStr], PathLike[AnyStr]]]):
+                    (paired, unpaired) output files for every input file.
+
+            Returns:
+                tuple[list[str], PathLike[AnyStr]]:
+                    The command arguments and the path to its log.
+                    The summary is written next to the log.
+        """
+        threads = str(self.threads)
+
+        trimmer_logging_basepath = self._trimmomatic_log_basename
+        trimmer_summary_path = os.path.join(
+            sample.paths.logdir, trimmer_logging_basepath+'.summary')
+        trimmer_log_path = os.path.join(
+            sample.paths.logdir, trimmer_logging_basepath+'.log')
+
+        # Paths are absolute, since a shared JVM doesn't run
+        # in the working directory of the pipeline
+        trimmer_cmd = [
+            *self._trimmomatic_prefix,
+            'PE' if len(basein) > 1 else 'SE',
+            '-threads', threads,
+            self._trimmomatic_phred,
             '-summary', trimmer_summary_path,
-            '', ' '.join(trimmer_args['basein']),
-            '', ' '.join(trimmer_args['baseout']),
+            *map(os.path.abspath, basein),
+            # SE mode writes a single output file
+            *([path for pair in baseout for path in pair]
+              if len(basein) > 1 else [baseout[0][0]]),
+            *self._trimmomatic_steps]
+
+        return trimmer_cmd, trimmer_log_path
+
+    def _trimmomatic_step_args(self) -> list[str]:
+        """Builds the Trimmomatic trimming steps
+            of the 'Trimmomatic' section.
+
+            Returns:
+                list[str]:
+                    The steps in the order Trimmomatic applies them.
+        """
+        trimmer_args = self._trimmomatic_args
+
+        return [
             f"ILLUMINACLIP:{
                 os.path.abspath(
                     trimmer_args['adapters'])}:{trimmer_args['illuminaclip']}",
-            f"LEADING:{trimmer_args['leading']}"
-            if 'leading' in trimmer_args else '',
-            f"TRAILING:{trimmer_args['trailing']}"
-            if 'trailing' in trimmer_args else '',
-            f"SLIDINGWINDOW:{trimmer_args['slightwindow']}"
-            if 'slightwindow' in trimmer_args else '',
-            f"MINLEN:{trimmer_args['minlen']}"
-            if 'minlen' in trimmer_args else '',
-            f"CROP:{trimmer_args['crop']}" if 'crop' in trimmer_args else '',
-            f"HEADCROP:{trimmer_args['headcrop']}"
-            if 'headcrop' in trimmer_args else '',
-            '>>', trimmer_summary_path,
-            '1>', trimmer_log_path,
-            '2>&1',])
-
-        self.logger.info("Starting to trim adapters with Trimmomatic")
-        self.logger.debug("Command: %s", trimmer_cmd)
-
-        execute(executor, trimmer_cmd)
+            *[
+                f"{step}:{trimmer_args[key]}" for key, step in (
+                    ('leading', 'LEADING'),
+                    ('trailing', 'TRAILING'),
+                    ('slidingwindow', 'SLIDINGWINDOW'),
+                    ('minlen', 'MINLEN'),
+                    ('crop', 'CROP'),
+                    ('headcrop', 'HEADCROP'))
+                if key in trimmer_args]]
+
+    def _fastp_command(
+        self,
+        sample: SampleDataContainer,
+        basein: tuple[PathLike[AnyStr], ...],
+        baseout: tuple[tuple[PathLike[AnyStr], PathLike[AnyStr]], ...]
+    ) -> tuple[list[str], PathLike[AnyStr]]:
+        """Builds the fastp command doing adapter, quality
+            and length trimming in a single multithreaded pass.
+            The trimming steps follow the 'Trimmomatic' section
+            (see '_fastp_trimming_args').
 
-        self.logger.info(
-            "Adapter trimming completed successfully. See the log at '%s'",
-            trimmer_summary_path)
+            Args:
+                The same as for '_trimmomatic_command'.
 
-        paired_trimmed_reads = []
-        for path in trimmer_args['baseout']:
-            if '.paired' in path:
-                paired_trimmed_reads.append(path)
-        return paired_trimmed_reads
+            Returns:
+                tuple[list[str], PathLike[AnyStr]]:
+                    The command arguments and the path to its log.
+        """
+        config = self.configurator.config
+        threads = str(self.threads)
+
+        fastp_log_path = os.path.join(sample.paths.logdir, 'fastp.log')
+
+        inputs = ['--in1', basein[0]]
+        outputs = ['--out1', baseout[0][0]]
+        if len(basein) > 1:
+            inputs.extend(['--in2', basein[1]])
+            outputs.extend([
+                '--out2', baseout[1][0],
+                '--unpaired1', baseout[0][1],
+                '--unpaired2', baseout[1][1]])
+
+        fastp_cmd = [
+            config['fastp'],
+            *inputs,
+            *outputs,
+            *self._fastp_static_args[len(basein) > 1],
+            '--thread', threads,
+            '--json', os.path.join(sample.processing_logpath, 'fastp.json'),
+            '--html', os.path.join(sample.processing_logpath, 'fastp.html')]
+
+        return fastp_cmd, fastp_log_path
+
+    def _fastp_trimming_args(
+        self,
+        fastp_args: dict[str, str],
+        paired: bool
+    ) -> list[str]:
+        """Translates the Trimmomatic trimming steps to fastp options,
+            so both trimmers trim the reads the same way.
+
+            SLIDINGWINDOW maps to fastp's 'cut_right', which drops
+            the rest of the read from the first window whose mean
+            quality is below the threshold, as Trimmomatic does.
+            fastp's read filters Trimmomatic lacks are disabled.
+
+            Options of the 'Fastp' section take precedence:
+            'cut-window-size' and 'cut-mean-quality' replace
+            the quality steps with fastp's own front and tail cutting,
+            'length-required' replaces MINLEN.
+
+            Args:
+                fastp_args (dict[str, str]):
+                    Options of the 'Fastp' section.
+                paired (bool):
+                    Whether R2 reads are trimmed too.
+
+            Returns:
+                list[str]:
+                    The fastp trimming options.
+        """
+        trimmer_args = self._trimmomatic_args
+
+        args = []
+        if 'cut-window-size' in fastp_args \
+                or 'cut-mean-quality' in fastp_args:
+            args.extend([
+                '--cut_front', '--cut_tail',
+                '--cut_window_size', fastp_args.get('cut-window-size', '4'),
+                '--cut_mean_quality',
+                fastp_args.get('cut-mean-quality', '15')])
+        else:
+            # LEADING and TRAILING cut single bases, like a window of 1
+            for key, side in (('leading', 'front'), ('trailing', 'tail')):
+                if key in trimmer_args:
+                    args.extend([
+                        f"--cut_{side}",
+                        f"--cut_{side}_window_size", '1',
+                        f"--cut_{side}_mean_quality", trimmer_args[key]])
+
+            # SLIDINGWINDOW cuts the rest of the read from the first
+            # window below the threshold, as fastp's 'cut_right' does
+            if 'slidingwindow' in trimmer_args:
+                window_size, mean_quality = \
+                    trimmer_args['slidingwindow'].split(':')
+                args.extend([
+                    '--cut_right',
+                    '--cut_right_window_size', window_size,
+                    '--cut_right_mean_quality', mean_quality])
+
+        mates = ('1', '2') if paired else ('1',)
+
+        if 'crop' in trimmer_args:
+            for mate in mates:
+                args.extend([f"--max_len{mate}", trimmer_args['crop']])
+
+        if 'headcrop' in trimmer_args:
+            for mate in mates:
+                args.extend([f"--trim_front{mate}", trimmer_args['headcrop']])
+
+        length_required = fastp_args.get(
+            'length-required', trimmer_args.get('minlen'))
+        if length_required:
+            args.extend(['--length_required', length_required])
+        else:
+            # Trimmomatic keeps reads of any length without MINLEN
+            args.append('--disable_length_filtering')
+
+        # Trimmomatic only trims, it never drops reads for the share
+        # of low quality bases, as fastp does by default
+        args.append('--disable_quality_filtering')
+
+        return args
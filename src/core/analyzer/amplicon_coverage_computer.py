@@ -31,20 +31,25 @@
 
     Note:
         Ensure that the configuration file contains correct paths
-        and parameters, especially for 'samtools' and 'bedtools'.
+        and parameters, especially for 'samtools'.
         The class also relies on the presence of mpileup files
         and the ability to generate them via command-line tools.
 """
 
 # region Imports
 import os
-import sys
 import re
+import csv
+import logging
+import subprocess
 
-import mmap
+import numpy
+import pandas
+import pysam
 
 from os import PathLike
-from typing import Union, AnyStr
+from concurrent.futures import ThreadPoolExecutor
+from typing import Union, Optional, Iterable, AnyStr
 
 from src.configurator import Configurator
 
@@ -52,8 +57,6 @@ from src.core.base import LoggerMixin
 from src.core.base import CommandExecutor
 
 from src.core.base import execute
-from src.core.base import touch
-from src.core.base import get_platform
 
 from src.core.sample_data_container import SampleDataContainer
 
@@ -62,11 +65,184 @@ from src.core.analyzer.i_data_preparator import IDataPreparator
 from src.utils.util import depth_filter
 # endregion
 
+# Indels of a pileup column, compiled once for every lookup
+_INDEL_RE = re.compile(rb'[+-]\d+[actgnACTGN]*')
+
 
 class PositionNotFoundError(Exception):
     """Base exception for handling source file positions management process"""
 
 
+def _contig_key(name: Union[int, str]) -> str:
+    """Normalizes a contig name, so 'chr1', '1' and the '01' tail
+        of a mpileup file name give the same key of 'mpileup_files'.
+
+        Args:
+            name (int or str):
+                A contig name or the tail of a mpileup file name.
+
+        Returns:
+            str:
+                Upper-cased name without the 'CHR' prefix,
+                dashes and leading zeros.
+    """
+    return str(name).upper().replace('CHR', '').strip(' -').lstrip('0')
+
+
+def _fill_coverage(
+    positions: numpy.ndarray,
+    depths: numpy.ndarray,
+    start: int,
+    end: int
+) -> Union[numpy.ndarray, None]:
+    """Builds the dense coverage vector of a region
+        from the positions and depths of the mpileup lines.
+
+        Positions missing from the mpileup have no coverage.
+        The vector is filled with a single scatter,
+        so no per-position Python objects are created.
+
+        Args:
+            positions (numpy.ndarray):
+                Sorted positions of the mpileup lines of one contig,
+                as samtools writes them.
+            depths (numpy.ndarray):
+                Depths of the same lines.
+            start (int):
+                Start position of the region.
+            end (int):
+                End position of the region, inclusive.
+
+        Returns:
+            numpy.ndarray or None:
+                Depth of every position of the region,
+                None if no line falls into the region.
+    """
+    # The region's lines are found by binary search
+    # instead of comparing every position of the contig
+    low = numpy.searchsorted(positions, start, side='left')
+    high = numpy.searchsorted(positions, end, side='right')
+    if low == high:
+        return None
+
+    coverages = numpy.zeros(end - start + 1, dtype=numpy.int32)
+    coverages[positions[low:high] - start] = depths[low:high]
+
+    return coverages
+
+
+def _region_mean(
+    positions: numpy.ndarray,
+    depth_sums: numpy.ndarray,
+    start: Union[int, numpy.ndarray],
+    end: Union[int, numpy.ndarray]
+) -> Union[float, numpy.ndarray]:
+    """Computes the mean coverage of a region
+        from the prefix sums of the depths.
+
+        Gives the same value as numpy.mean over the vector
+        of '_fill_coverage' without building it. Given arrays
+        of bounds, computes the means of all the regions at once.
+
+        Args:
+            positions (numpy.ndarray):
+                Sorted positions of the mpileup lines of one contig.
+            depth_sums (numpy.ndarray):
+                Prefix sums of the depths of the same lines,
+                starting with zero.
+            start (int or numpy.ndarray):
+                Start position of the region.
+            end (int or numpy.ndarray):
+                End position of the region, inclusive.
+
+        Returns:
+            float or numpy.ndarray:
+                The mean depth over every position of the region,
+                zero if no line falls into the region.
+    """
+    low = numpy.searchsorted(positions, start, side='left')
+    high = numpy.searchsorted(positions, end, side='right')
+
+    return (depth_sums[high] - depth_sums[low]) / (end - start + 1)
+
+
+def _scan_pileup(
+    data: bytes,
+    alt: bytes = b''
+) -> tuple[int, int, int, int, int, int]:
+    """Counts the alt bases and the indels of a pileup column
+        in a single pass over its bytes.
+
+        Every indel is classified by the case of its first base
+        and skipped by its stated length, so its bases are never
+        taken for read bases. The mapping quality after '^'
+        is skipped as well.
+
+        Args:
+            data (bytes):
+                The bases column of a mpileup line.
+            alt (bytes, optional):
+                The alternative allele. Its bases are counted
+                only if it is a single base.
+
+        Returns:
+            tuple[int, int, int, int, int, int]:
+                Counts of r1 and r2 alt bases, r1 insertions,
+                r1 deletions, r2 insertions and r2 deletions.
+    """
+    # Bytes never equal -1, so no alt base is counted by default
+    alt_upper, alt_lower = (alt.upper()[0], alt.lower()[0]) \
+        if len(alt) == 1 else (-1, -1)
+
+    r1_alt, r2_alt = 0, 0
+    r1_ins, r1_del, r2_ins, r2_del = 0, 0, 0, 0
+    i, n = 0, len(data)
+    while i < n:
+        char = data[i]
+
+        if char == alt_upper:
+            r1_alt += 1
+            i += 1
+            continue
+        if char == alt_lower:
+            r2_alt += 1
+            i += 1
+            continue
+
+        # '^' is followed by the mapping quality, which may be '+'/'-'
+        if char == 94:  # '^'
+            i += 2
+            continue
+
+        if char != 43 and char != 45:  # '+', '-'
+            i += 1
+            continue
+
+        j = i + 1
+        while j < n and 48 <= data[j] <= 57:  # '0'-'9'
+            j += 1
+        if j == i + 1 or j == n:
+            i = j
+            continue
+
+        base = data[j] | 0x20  # lower-cased
+        if base in b'acgtn':
+            is_r2 = data[j] & 0x20
+            if char == 43:
+                if is_r2:
+                    r2_ins += 1
+                else:
+                    r1_ins += 1
+            elif is_r2:
+                r2_del += 1
+            else:
+                r1_del += 1
+
+        i = j + int(data[i+1:j])
+
+    return r1_alt, r2_alt, r1_ins, r1_del, r2_ins, r2_del
+
+
 class AmpliconCoverageDataPreparator(LoggerMixin, IDataPreparator):
     """The AmpliconCoverageDataPreparator class is designed to
         generate mpileup files for specified regions of a sequenced sample
@@ -82,7 +258,8 @@ class AmpliconCoverageDataPreparator(LoggerMixin, IDataPreparator):
     def __init__(
         self,
         configurator: Configurator,
-        filter_func: callable
+        filter_func: callable,
+        threads: int = None
     ):
         """Initializes the AmpliconCoverageDataPreparator
             with configuration and filter function.
@@ -91,8 +268,14 @@ class AmpliconCoverageDataPreparator(LoggerMixin, IDataPreparator):
                 configurator (Configurator):
                     The configuration object containing settings and paths.
                 filter_func (callable):
-                    A function to filter coverage data, e.g.,
-                    calculating average or median.
+                    A function reducing the coverage of a region,
+                    given as a numpy.ndarray of depths, to a float,
+                    e.g. numpy.mean or numpy.median. Functions
+                    of sequences like 'statistics.mean' work as well,
+                    but iterate over the array in Python.
+                threads (int, optional):
+                    Number of regions piled up simultaneously.
+                    Defaults to '--threads'.
         """
         super().__init__(logger=configurator.logger)
 
@@ -106,14 +289,26 @@ class AmpliconCoverageDataPreparator(LoggerMixin, IDataPreparator):
         self.coords = self.config['coords-file']
 
         self.filter_func = filter_func
+        self.threads = threads or configurator.args.threads
 
         self.mpileup_files = {}
+        # Pileups of the variant sites only, kept apart from the ones
+        # of whole regions, see 'generate_mpileup_at_sites'
+        self.site_mpileup_files = {}
         self.results = []
 
+        # Parsed columns of the mpileup files,
+        # see '_load_mpileup', '_load_contig' and '_load_pileup_rows'
+        self._mpileup_cache = {}
+        self._contig_cache = {}
+        self._pileup_cache = {}
+
     def generate_mpileup(
         self,
         sample: SampleDataContainer,
-        executor: Union[CommandExecutor, callable]
+        executor: Union[CommandExecutor, callable],
+        positions: Optional[PathLike[AnyStr]] = None,
+        infix: str = ''
     ) -> list[PathLike[AnyStr]]:
         """Generates mpileup files for specified regions of the sample.
 
@@ -122,54 +317,241 @@ class AmpliconCoverageDataPreparator(LoggerMixin, IDataPreparator):
                     The sample containing sequencing data.
                 executor (callable):
                     The command executor or function to run system commands.
+                positions (PathLike, optional):
+                    A BED or position list file limiting the piled up
+                    positions of the regions. Defaults to None,
+                    which means every position of the regions.
+                infix (str, optional):
+                    Inserted into the file names after the sample
+                    identifier, keeps pileups of different positions
+                    of the same regions apart.
 
             Returns:
                 list of PathLike: Paths to the generated mpileup files.
         """
-        mp_files = []
-
         sample.bam_filepath = os.path.join(
             sample.processing_path,
             sample.sid+".sorted.read_groups.recalibrated.bam")
 
         try:
-            for region, out_name in sample.target_regions:
-                out_path = os.path.join(
-                    sample.processing_path, f"{sample.sid}.{out_name}")
-
-                cmd = ' '.join([
-                    self.configurator.config['samtools'], "mpileup",
-                    sample.bam_filepath,
-                    # skip bases with baseQ/BAQ smaller than value was given
-                    # '--min-BQ', self.config['min-bq'],
-                    '--no-BAQ' if 'no-BAQ' in self.config else '',
-                    '--max-depth', self.config['max-depth'],
-                    '--region', region,
-                    '--reference', self.configurator.config['reference'],
-                    '--count-orphans',  # do not discard anomalous read pairs
-                    '--output', out_path])
-
-                execute(executor, cmd)
+            regions = list(sample.target_regions)
+
+            # Every region is piled up by its own samtools process,
+            # the threads left over decompress the BAM for them
+            workers = max(1, min(self.threads, len(regions)))
+            decode_threads = max(1, self.threads // workers)
+
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                mp_files = [
+                    out_path for out_path in pool.map(
+                        lambda target: self._generate_region_mpileup(
+                            sample, *target, executor,
+                            decode_threads, positions, infix),
+                        regions)
+                    if out_path is not None]
 
-                try:
-                    depth_filter(
-                        filepath=out_path,
-                        depth=2,
-                        logger=self.logger
-                    )
+            return mp_files
+
+        except TypeError:
+            return None
+
+    def generate_mpileup_at_sites(
+        self,
+        sample: SampleDataContainer,
+        sites: Iterable[tuple[str, Union[int, str]]],
+        executor: Union[CommandExecutor, callable]
+    ) -> list[PathLike[AnyStr]]:
+        """Generates mpileup files of the sample's regions
+            holding only the given sites, for 'count_variant_coverage'.
 
-                    mp_files.append(out_path)
+            Variant coverage needs a single line per variant,
+            so samtools skips every other position of the regions.
+            The files don't suit 'count_region_coverage', so they are
+            named '<sid>.sites.<region>' and registered apart from
+            the pileups of whole regions.
 
-                except FileNotFoundError:
-                    self.logger.info(
-                        'Skip mpileup performing for "%s"', out_path
-                    )
+            Args:
+                sample (SampleDataContainer):
+                    The sample containing sequencing data.
+                sites (Iterable[tuple[str, Union[int, str]]]):
+                    Contigs, named as in the BAM file,
+                    and 1-based positions of the variants.
+                executor (callable):
+                    The command executor or function to run system commands.
 
-            return mp_files
+            Returns:
+                list of PathLike: Paths to the generated mpileup files.
+        """
+        sites_path = os.path.join(
+            sample.processing_path, f"{sample.sid}.sites.tsv")
 
-        except TypeError:
+        with open(sites_path, mode='w', encoding='utf-8') as fd:
+            for contig, position in sorted({
+                (contig, int(position)) for contig, position in sites
+                if str(position).strip().isdigit()
+            }):
+                fd.write(f"{contig}\t{position}\n")
+
+        mp_files = self.generate_mpileup(
+            sample=sample, executor=executor,
+            positions=sites_path, infix='sites.')
+
+        self._register_mpileups(mp_files, self.site_mpileup_files)
+
+        return mp_files
+
+    def _register_mpileups(
+        self,
+        mp_files: list[PathLike[AnyStr]],
+        registry: Optional[dict[str, PathLike[AnyStr]]] = None
+    ) -> None:
+        """Registers the mpileup files by the key of the chromosome
+            their names end with, replacing the cached data
+            of the files generated before.
+
+            Args:
+                mp_files (list[PathLike]):
+                    Paths to the generated mpileup files.
+                registry (dict, optional):
+                    The registry to add the files to.
+                    Defaults to 'mpileup_files'.
+        """
+        if registry is None:
+            registry = self.mpileup_files
+
+        for file_path in mp_files:
+            registry[_contig_key(file_path[-2:])] = file_path
+
+            self._mpileup_cache.pop(file_path, None)
+            self._pileup_cache.pop(file_path, None)
+
+        self._contig_cache = {
+            key: value for key, value in self._contig_cache.items()
+            if key[0] not in mp_files}
+
+    def _generate_region_mpileup(
+        self,
+        sample: SampleDataContainer,
+        region: str,
+        out_name: str,
+        executor: Union[CommandExecutor, callable],
+        decode_threads: int = 1,
+        positions: Optional[PathLike[AnyStr]] = None,
+        infix: str = ''
+    ) -> Optional[PathLike[AnyStr]]:
+        """Generates the depth-filtered mpileup file of a single region.
+
+            Args:
+                sample (SampleDataContainer):
+                    The sample containing sequencing data.
+                region (str):
+                    The region passed to samtools.
+                out_name (str):
+                    Name of the mpileup file after the sample identifier.
+                executor (callable):
+                    The command executor or function to run system commands.
+                decode_threads (int, optional):
+                    Number of threads decompressing the BAM file.
+                positions (PathLike, optional):
+                    A BED or position list file limiting
+                    the piled up positions of the region.
+                infix (str, optional):
+                    Inserted into the file name
+                    after the sample identifier.
+
+            Returns:
+                PathLike or None:
+                    Path to the mpileup file, None if it isn't generated.
+        """
+        out_path = os.path.join(
+            sample.processing_path, f"{sample.sid}.{infix}{out_name}")
+
+        cmd = [
+            self.configurator.config['samtools'], "mpileup",
+            sample.bam_filepath,
+            # skip bases with baseQ/BAQ smaller than value was given
+            # '--min-BQ', self.config['min-bq'],
+            *(['--no-BAQ'] if 'no-BAQ' in self.config else []),
+            '--max-depth', self.config['max-depth'],
+            '--region', region,
+            *(['--positions', positions] if positions is not None else []),
+            '--reference', self.configurator.config['reference'],
+            '--count-orphans',  # do not discard anomalous read pairs
+            # mpileup has no '--threads', htslib takes them as an option
+            *(['--input-fmt-option', f"nthreads={decode_threads}"]
+              if decode_threads > 1 else [])]
+
+        try:
+            if isinstance(executor, CommandExecutor) \
+                    and executor.caller is None:
+                self._filter_mpileup_stream(
+                    executor, cmd, out_path, depth=2)
+
+            else:
+                # A custom caller can't hand over the output stream,
+                # so the mpileup is written and filtered afterwards
+                execute(executor, [*cmd, '--output', out_path])
+                depth_filter(
+                    filepath=out_path,
+                    depth=2,
+                    logger=self.logger
+                )
+
+        except FileNotFoundError:
+            self.logger.info(
+                'Skip mpileup performing for "%s"', out_path
+            )
             return None
 
+        return out_path
+
+    def _filter_mpileup_stream(
+        self,
+        executor: CommandExecutor,
+        cmd: list[str],
+        out_path: PathLike[AnyStr],
+        depth: int
+    ) -> None:
+        """Runs samtools mpileup and writes only the lines
+            with at least 'depth' reads as they come from its stdout.
+
+            The unfiltered mpileup is never written to disk,
+            so it isn't read back by 'depth_filter' either.
+
+            Args:
+                executor (CommandExecutor):
+                    The executor starting the command in the background.
+                cmd (list[str]):
+                    The mpileup command writing to stdout.
+                out_path (PathLike):
+                    Path to the filtered mpileup file.
+                depth (int):
+                    The minimum depth of the written lines.
+
+            Raises:
+                FileNotFoundError:
+                    If the command can't be started.
+        """
+        process = execute(
+            executor, cmd, stdout=subprocess.PIPE, background=True)
+        if not isinstance(process, subprocess.Popen):
+            raise FileNotFoundError(
+                f"Can't start '{cmd[0]}' to write '{out_path}'")
+
+        with process.stdout as stream, open(
+            out_path, mode='wb', buffering=1 << 20
+        ) as out_fd:
+            for line in stream:
+                try:
+                    if int(line.split(b'\t', 4)[3]) >= depth:
+                        out_fd.write(line)
+                except (ValueError, IndexError):
+                    continue
+
+        if process.wait() != os.EX_OK:
+            self.logger.error(
+                "Command '%s' exited with status '%s'",
+                cmd, process.returncode)
 
     def count_region_coverage(
         self,
@@ -192,7 +574,9 @@ class AmpliconCoverageDataPreparator(LoggerMixin, IDataPreparator):
 
             Returns:
                 float:
-                    The filtered average coverage within the region.
+                    The filtered average coverage within the region,
+                    'filter_func' gets the coverage of every position
+                    of the region as a numpy.ndarray.
         """
         try:
             start, end = int(start), int(end)
@@ -201,43 +585,29 @@ class AmpliconCoverageDataPreparator(LoggerMixin, IDataPreparator):
 
             chromosome = str(chromosome).upper()
             try:
-                with open(mpileup, 'r', encoding='utf-8') as fd:
-                    coverages = []
-                    last_position = start - 1
-
-                    for line in fd:
-                        chrom, position, _, depth = \
-                            line.strip().split('\t')[:4]
-
-                        position, depth = int(position), int(depth)
-
-                        chrom = chrom.upper().replace('CHR', '')
-                        if chromosome != chrom or \
-                           start > position or \
-                           'X' in chrom:
-                            continue
-                        if position > end > 0:
-                            break
-
-                        if position > last_position + 1:
-                            coverages.extend(
-                                [0] * (position - last_position - 1))
-
-                        coverages.append(depth)
-                        last_position = position
-                    if coverages:
-                        if len(coverages) < end - start + 1:
-                            coverages.extend(
-                                [0] * (end - start + 1 - len(coverages)))
-
-                        return self.filter_func(coverages)
-                    return 0.0
+                positions, depths, depth_sums = self._load_contig(
+                    mpileup, chromosome)
             except FileNotFoundError:
                 self.logger.warning(
                     "There is no mpileup-file for chromosome %s", chromosome)
 
                 return 0.0
 
+            # Contigs with 'X' in the name are never counted
+            if 'X' in chromosome:
+                return 0.0
+
+            # The mean doesn't need the coverage vector,
+            # it's the difference of two prefix sums
+            if self.filter_func is numpy.mean:
+                return _region_mean(positions, depth_sums, start, end)
+
+            coverages = _fill_coverage(positions, depths, start, end)
+            if coverages is None:
+                return 0.0
+
+            return self.filter_func(coverages)
+
         except (SyntaxError, TypeError, OSError, IOError) as e:
             self.logger.critical(
                 "An error '%s' occurred in '%s.%s'. Abort",
@@ -245,49 +615,233 @@ class AmpliconCoverageDataPreparator(LoggerMixin, IDataPreparator):
                 self.perform.__func__.__name__)
             raise e
 
+    def count_regions_coverage(
+        self,
+        mpileup: PathLike[AnyStr],
+        chromosome: Union[int, str],
+        starts: numpy.ndarray,
+        ends: numpy.ndarray
+    ) -> numpy.ndarray:
+        """Counts the coverage within several regions
+            of the same contig from a mpileup file.
+
+            With numpy.mean as 'filter_func', the means of all
+            the regions are computed at once from the prefix sums
+            of the depths. Other functions get the coverage
+            of every region, see 'count_region_coverage'.
+
+            Args:
+                mpileup (PathLike):
+                    Path to the mpileup file.
+                chromosome (int or str):
+                    Chromosome identifier.
+                starts (numpy.ndarray):
+                    Start positions of the regions.
+                ends (numpy.ndarray):
+                    End positions of the regions.
+
+            Returns:
+                numpy.ndarray:
+                    The filtered coverage of every region.
+        """
+        if self.filter_func is not numpy.mean:
+            return numpy.array([
+                self.count_region_coverage(mpileup, chromosome, start, end)
+                for start, end in zip(starts, ends)], dtype=float)
+
+        chromosome = str(chromosome).upper()
+        try:
+            positions, _, depth_sums = self._load_contig(mpileup, chromosome)
+        except FileNotFoundError:
+            self.logger.warning(
+                "There is no mpileup-file for chromosome %s", chromosome)
+
+            return numpy.zeros(len(starts))
+
+        # Contigs with 'X' in the name are never counted
+        if 'X' in chromosome:
+            return numpy.zeros(len(starts))
+
+        return _region_mean(
+            positions, depth_sums,
+            numpy.minimum(starts, ends), numpy.maximum(starts, ends))
+
+    def _load_contig(
+        self,
+        mpileup: PathLike[AnyStr],
+        chromosome: str
+    ) -> tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]:
+        """Selects the positions and depths of a single contig
+            of a mpileup file and sums the depths up, once per contig.
+
+            Regions of the same contig share the selection,
+            so its lines are compared only for the first region.
+
+            Args:
+                mpileup (PathLike):
+                    Path to the mpileup file.
+                chromosome (str):
+                    Upper-cased contig name without the 'CHR' prefix.
+
+            Returns:
+                tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]:
+                    Positions and depths of the contig's lines
+                    and prefix sums of the depths, starting with zero.
+
+            Raises:
+                FileNotFoundError:
+                    If the mpileup file doesn't exist.
+        """
+        key = (mpileup, chromosome)
+        if key in self._contig_cache:
+            return self._contig_cache[key]
+
+        names, codes, positions, depths = self._load_mpileup(mpileup)
+
+        # The mpileup of a region has a single contig,
+        # its lines are taken without comparing them
+        matches = numpy.flatnonzero(names == chromosome)
+        if len(names) != 1 or len(matches) != 1:
+            on_chromosome = numpy.isin(codes, matches)
+            positions, depths = positions[on_chromosome], depths[on_chromosome]
+
+        columns = (
+            positions, depths,
+            numpy.concatenate(([0], numpy.cumsum(depths, dtype=numpy.int64))))
+
+        self._contig_cache[key] = columns
+
+        return columns
+
+    def _load_mpileup(
+        self,
+        mpileup: PathLike[AnyStr]
+    ) -> tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray, numpy.ndarray]:
+        """Loads the contig, position and depth columns of a mpileup file
+            into arrays, once per file.
+
+            The columns are parsed by the C parser of pandas,
+            the rest of every line is skipped. Contigs are kept
+            as codes of their distinct names, so they are compared
+            as integers rather than strings.
+
+            Args:
+                mpileup (PathLike):
+                    Path to the mpileup file.
+
+            Returns:
+                tuple[numpy.ndarray, numpy.ndarray,
+                      numpy.ndarray, numpy.ndarray]:
+                    Distinct upper-cased contig names without
+                    the 'CHR' prefix, codes of the names,
+                    positions and depths of every line.
+
+            Raises:
+                FileNotFoundError:
+                    If the mpileup file doesn't exist.
+        """
+        if mpileup in self._mpileup_cache:
+            return self._mpileup_cache[mpileup]
+
+        try:
+            # Quality strings may contain quotes, so quoting is off
+            frame = pandas.read_csv(
+                mpileup, sep='\t', header=None, usecols=[0, 1, 3],
+                dtype={0: 'category', 1: numpy.int64, 3: numpy.int32},
+                quoting=csv.QUOTE_NONE, na_filter=False, engine='c')
+
+            # Contig names are normalized once per distinct name
+            contigs = frame[0].cat
+            columns = (
+                contigs.categories.astype(str).str.upper()
+                .str.replace('CHR', '').to_numpy(),
+                contigs.codes.to_numpy(),
+                frame[1].to_numpy(),
+                frame[3].to_numpy())
+
+        except pandas.errors.EmptyDataError:
+            columns = (
+                numpy.empty(0, dtype=object),
+                numpy.empty(0, dtype=numpy.int8),
+                numpy.empty(0, dtype=numpy.int64),
+                numpy.empty(0, dtype=numpy.int32))
+
+        self._mpileup_cache[mpileup] = columns
+
+        return columns
+
+    def _load_pileup_rows(
+        self,
+        mpileup: PathLike[AnyStr]
+    ) -> dict[int, tuple[int, bytes]]:
+        """Loads the depth and bases columns of a mpileup file
+            keyed by position, once per file.
+
+            Args:
+                mpileup (PathLike):
+                    Path to the mpileup file.
+
+            Returns:
+                dict[int, tuple[int, bytes]]:
+                    Depth and undecoded bases of the line
+                    of every position.
+
+            Raises:
+                FileNotFoundError:
+                    If the mpileup file doesn't exist.
+                ValueError:
+                    If a line has no numeric position or depth.
+        """
+        if mpileup in self._pileup_cache:
+            return self._pileup_cache[mpileup]
+
+        rows = {}
+        with open(mpileup, mode='rb', buffering=1 << 20) as fd:
+            for line in fd:
+                fields = line.split(b'\t', 5)
+                rows[int(fields[1])] = (int(fields[3]), fields[4])
+
+        self._pileup_cache[mpileup] = rows
+
+        return rows
+
     @staticmethod
-    def count_indels(data: str) -> dict[str, int]:
+    def count_indels(data: AnyStr) -> tuple[int, int, int, int]:
         """Counts the number of insertions and deletions
-            for two replicates (r1 and r2) based on the input data string.
+            for two replicates (r1 and r2) based on the pileup column.
+
+            The column is scanned once byte by byte, see '_scan_pileup'.
 
             Args:
-                data (str):
-                    A string containing insertion and deletion patterns
-                    in the form '+<number><bases>' or '-<number><bases>',
-                    where <bases> is a sequence of [ACTGNactgn] characters.
+                data (AnyStr):
+                    A pileup column containing insertion and deletion
+                    patterns in the form '+<number><bases>'
+                    or '-<number><bases>', where <bases> is a sequence
+                    of [ACTGNactgn] characters.
 
             Returns:
-                dict[str, int]: \\
-                    key:
-                        An indel signature. \\
-                    value:
-                        Count of the key in pileup line
+                tuple[int, int, int, int]:
+                    Counts of r1 insertions, r1 deletions,
+                    r2 insertions and r2 deletions.
         """
-        matches = re.findall(
-            r'([+-])(\d+)([ACTGNactgn]+)', data)
-
-        cov_dict = {}
-        if matches:
-            for sign, number, bases in matches:
-                var_match = str(sign)+str(number)+str(bases[:int(number)])
-                if var_match:
-                    if var_match in cov_dict:
-                        cov_dict[var_match] += 1
-                    else:
-                        cov_dict[var_match] = 1
-        return cov_dict
+        if isinstance(data, str):
+            data = data.encode()
+
+        return _scan_pileup(data)[2:]
 
     @staticmethod
     def count_target_char(
         src: AnyStr,
         target_char: AnyStr = '*'
     ) -> int:
-        pattern = re.compile(rf'([+-]\d+[actgnACTGN]*)|({target_char})')
-        count = 0
-        for match in pattern.finditer(src):
-            if match.group(2):
-                count += 1
-        return count
+        if isinstance(src, str):
+            src = src.encode()
+        if isinstance(target_char, str):
+            target_char = target_char.encode()
+
+        # Bases of the indels aren't read bases, so they are cut out
+        # before the target is counted
+        return _INDEL_RE.sub(b'', src).count(target_char)
 
     def count_variant_coverage(
         self,
@@ -323,11 +877,12 @@ class AmpliconCoverageDataPreparator(LoggerMixin, IDataPreparator):
             Note:
                 - This method searches for the specified position
                 in a chromosome-specific mpileup file.
-                - It uses memory-mapped file access for efficiency.
+                - The mpileup file is read once and its lines
+                are looked up by position afterwards.
                 - It counts reference matches ('.' and ',')
                 and mismatches (based on alt allele).
-                - It also calls `count_indels()` to count insertions
-                and deletions supporting the variant.
+                - Alt bases, insertions and deletions supporting
+                the variant are counted in a single pass.
                 - Returns (-1, -1, -1) if the position is not found
                 or an error occurs.
                 - Raises FileNotFoundError if the mpileup file
@@ -337,139 +892,88 @@ class AmpliconCoverageDataPreparator(LoggerMixin, IDataPreparator):
             "Starting to determine (%s:%s>%s, %s) variant coverage",
             chromosome, ref, alt, position)
 
-        chromosome = str(chromosome)  # .replace('chr', '').strip()
+        chromosome = _contig_key(chromosome)
         position = str(position).strip()
 
-        chromosome = '0'+chromosome if chromosome in [
-            '0', '1', '2', '3', '4', '5', '6', '7', '8', '9'] else chromosome
+        # Pileups of whole regions hold the sites too
+        mpileup_path = self.site_mpileup_files.get(
+            chromosome, self.mpileup_files.get(chromosome))
 
-        if chromosome in self.mpileup_files:
-            self.logger.debug(
-                "Chromosome %s found on %s",
-                chromosome,
-                os.path.abspath(self.mpileup_files[chromosome]))
+        if mpileup_path is not None:
+            if self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug(
+                    "Chromosome %s found on %s",
+                    chromosome, os.path.abspath(mpileup_path))
 
             try:
-                with open(
-                    self.mpileup_files[chromosome],
-                    mode='r',
-                    encoding='utf-8'
-                ) as fd:
-                    self.logger.debug(
-                        "File '%s' opened with 'r' flag",
-                        os.path.abspath(self.mpileup_files[chromosome]))
-
-                    with mmap.mmap(
-                        fd.fileno(), 0, access=mmap.ACCESS_READ
-                    ) as mm:
-                        b_position = mm.find(bytes(
-                            position, encoding='utf-8'))
-
-                        if b_position != 0:
-                            line_number = mm.rfind(b'\n', 0, b_position) + 1
-                            line_number = mm[:line_number].count(b'\n') + 1
-
-                            self.logger.debug(
-                                "Position '%s' found at line %s",
-                                position, line_number)
-
-                            # region Rules:
-                            #   Forward Reverse Meaning
-                            #   . dot	, comma	Base matches the reference base
-                            #   ACGTN	  acgtn	Base is a mismatch to the
-                            #                   reference base
-                            #       >	      <	Reference skip (due to CIGAR “N”)
-                            #       *	    */#	Deletion of the
-                            #                   reference base (CIGAR “D”)
-                            #
-                            # Deleted bases are shown as “*” on both strands
-                            # unless --reverse-del is used,
-                            # in which case they are shown as “#”
-                            # on the reverse strand.
-                            #
-                            # If there is an insertion after this read base,
-                            # text matching “\+[0-9]+[ACGTNacgtn*#]+”:
-                            #       a “+” character followed by
-                            #       an integer giving the length
-                            #       of the insertion and then
-                            #       the inserted sequence.
-                            #
-                            # Pads are shown as “*” # unless --reverse-del
-                            # is used, in which case pads
-                            # on the reverse strand will be shown as “#”.
-                            #
-                            # If there is a deletion after this read base,
-                            # text matching “-[0-9]+[ACGTNacgtn]+”:
-                            #       a “-” character followed by the deleted
-                            #       reference bases represented similarly.
-                            # (Subsequent pileup lines will contain “*”
-                            # for this read indicating the deleted bases.)
-                            #
-                            # If this is the last position covered by the read,
-                            # a “$” character.
-                            # endregion
-
-                            depth, pileup_data = fd.readlines()[line_number-1]\
-                                .split('\t')[3:5]
-                            depth = int(depth)
-
-                            # r1_ref_count = pileup_data.count('.')
-                            # r2_ref_count = pileup_data.count(',')
-
-                            r1_alt_count = AmpliconCoverageDataPreparator\
-                                .count_target_char(
-                                    src=pileup_data, target_char=alt.upper())
-                            r2_alt_count = AmpliconCoverageDataPreparator\
-                                .count_target_char(
-                                    src=pileup_data, target_char=alt.lower())
-
-                            indels_dict = self.count_indels(pileup_data)
-
-                            r1_ins_count, r1_del_count = 0, 0
-                            r2_ins_count, r2_del_count = 0, 0
-
-                            if indels_dict:
-                                number_regex = re.compile(r"([+-])(\d+)")
-                                for key, value in indels_dict.items():
-                                    sign, number = number_regex.search(key)\
-                                        .groups()
-                                    bases = key[-int(number):]
-
-                                    if sign == '-':
-                                        if bases.isupper():
-                                            r1_del_count += value
-                                        elif bases.islower():
-                                            r2_del_count += value
-
-                                    elif sign == '+':
-                                        if bases.isupper():
-                                            r1_ins_count += value
-                                        elif bases.islower():
-                                            r2_ins_count += value
-
-                            total_alt_count = (
-                                r1_alt_count + r2_alt_count +
-                                r1_ins_count + r1_del_count +
-                                r2_ins_count + r2_del_count)
-
-                            return (
-                                depth,
-                                total_alt_count,
-                                round(total_alt_count/depth, 3))
-
-                        self.logger.warning(
-                            "Can't find position '%s' in mpileup data '%s'",
-                            position, os.path.basename(
-                                self.mpileup_files[chromosome]))
-
-                        return -1, -1, -1
+                row = self._load_pileup_rows(mpileup_path).get(int(position))
 
             except (FileNotFoundError, ValueError):
                 self.logger.critical(
-                    "File '%s' not found or it is empty",
-                    self.mpileup_files[chromosome])
+                    "File '%s' not found or it is empty", mpileup_path)
                 return -1, -1, -1
 
+            if row is None:
+                self.logger.warning(
+                    "Can't find position '%s' in mpileup data '%s'",
+                    position, os.path.basename(mpileup_path))
+
+                return -1, -1, -1
+
+            self.logger.debug("Position '%s' found", position)
+
+            # region Rules:
+            #   Forward Reverse Meaning
+            #   . dot	, comma	Base matches the reference base
+            #   ACGTN	  acgtn	Base is a mismatch to the
+            #                   reference base
+            #       >	      <	Reference skip (due to CIGAR “N”)
+            #       *	    */#	Deletion of the
+            #                   reference base (CIGAR “D”)
+            #
+            # Deleted bases are shown as “*” on both strands
+            # unless --reverse-del is used,
+            # in which case they are shown as “#”
+            # on the reverse strand.
+            #
+            # If there is an insertion after this read base,
+            # text matching “\+[0-9]+[ACGTNacgtn*#]+”:
+            #       a “+” character followed by
+            #       an integer giving the length
+            #       of the insertion and then
+            #       the inserted sequence.
+            #
+            # Pads are shown as “*” # unless --reverse-del
+            # is used, in which case pads
+            # on the reverse strand will be shown as “#”.
+            #
+            # If there is a deletion after this read base,
+            # text matching “-[0-9]+[ACGTNacgtn]+”:
+            #       a “-” character followed by the deleted
+            #       reference bases represented similarly.
+            # (Subsequent pileup lines will contain “*”
+            # for this read indicating the deleted bases.)
+            #
+            # If this is the last position covered by the read,
+            # a “$” character.
+            # endregion
+
+            depth, pileup_data = row
+
+            # r1_ref_count = pileup_data.count(b'.')
+            # r2_ref_count = pileup_data.count(b',')
+
+            r1_alt_count, r2_alt_count, \
+                r1_ins_count, r1_del_count, r2_ins_count, r2_del_count = \
+                _scan_pileup(pileup_data, alt.encode())
+
+            total_alt_count = (
+                r1_alt_count + r2_alt_count +
+                r1_ins_count + r1_del_count +
+                r2_ins_count + r2_del_count)
+
+            return depth, total_alt_count, round(total_alt_count/depth, 3)
+
         else:
             msg = "The mpileup file for " \
                  f"chromosome {chromosome} doesn't exist."
@@ -482,6 +986,88 @@ class AmpliconCoverageDataPreparator(LoggerMixin, IDataPreparator):
 
             raise FileNotFoundError(msg)
 
+    def _read_coords(
+        self
+    ) -> tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]:
+        """Reads the regions of the coords file
+            that have a mpileup file.
+
+            The file is parsed by the C parser of pandas
+            and the contigs are normalized at once.
+
+            Returns:
+                tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]:
+                    Contig keys (see '_contig_key'), starts and ends
+                    of the regions.
+        """
+        try:
+            frame = pandas.read_csv(
+                self.coords, sep='\t', header=None, usecols=[0, 1, 2],
+                dtype=str, comment='#', quoting=csv.QUOTE_NONE,
+                na_filter=False, engine='c')
+
+        except pandas.errors.EmptyDataError:
+            return (
+                numpy.empty(0, dtype=object),
+                numpy.empty(0, dtype=numpy.int64),
+                numpy.empty(0, dtype=numpy.int64))
+
+        chroms = frame[0].str.strip()
+        frame = frame[~chroms.str.startswith(';')]
+        chroms = chroms[frame.index]
+
+        # Every distinct contig is normalized once
+        chroms = chroms.map({
+            chrom: _contig_key(chrom) for chrom in chroms.unique()})
+
+        selected = chroms.isin(self.mpileup_files).to_numpy()
+
+        return (
+            chroms.to_numpy()[selected],
+            frame[1].to_numpy()[selected].astype(numpy.int64),
+            frame[2].to_numpy()[selected].astype(numpy.int64))
+
+    @staticmethod
+    def _write_bam_coords(
+        bam_filepath: PathLike[AnyStr],
+        coords_filepath: PathLike[AnyStr]
+    ) -> None:
+        """Writes the contig, start, end and mapping quality
+            of the mapped alignments of a BAM file, skipping
+            the intervals repeated by adjacent alignments.
+
+            The alignments are read in process with pysam, the same
+            as 'bedtools bamtobed | cut -f1,2,3,5 | uniq -u' wrote them.
+
+            Args:
+                bam_filepath (PathLike):
+                    Path to the BAM file.
+                coords_filepath (PathLike):
+                    Path to the written coords file.
+        """
+        with pysam.AlignmentFile(bam_filepath, 'rb') as bam, open(
+            coords_filepath, mode='w', encoding='utf-8', buffering=1 << 20
+        ) as fd:
+            previous, repeated = None, False
+            for read in bam.fetch(until_eof=True):
+                if read.is_unmapped or read.reference_end is None:
+                    continue
+
+                interval = (
+                    read.reference_name, read.reference_start,
+                    read.reference_end, read.mapping_quality)
+
+                if interval == previous:
+                    repeated = True
+                    continue
+
+                if previous is not None and not repeated:
+                    fd.write('%s\t%d\t%d\t%d\n' % previous)
+                previous, repeated = interval, False
+
+            if previous is not None and not repeated:
+                fd.write('%s\t%d\t%d\t%d\n' % previous)
+
     def perform(
         self,
         sample: SampleDataContainer,
@@ -502,55 +1088,18 @@ class AmpliconCoverageDataPreparator(LoggerMixin, IDataPreparator):
         """
         mpileup_data_list = self.generate_mpileup(
             sample=sample,
-            executor=os.system
+            executor=executor
         )
 
-        for file_path in mpileup_data_list:
-            chromosome = file_path[-2:]
-            self.mpileup_files[chromosome] = file_path
+        self._register_mpileups(mpileup_data_list)
 
         if not os.path.exists(self.coords) or sample.sid not in self.coords:
             self.coords = os.path.join(
                 sample.processing_path,
                 sample.sid+".coords")
 
-            touch(self.coords)
-
             try:
-                cmd = ''
-
-                match get_platform():
-                    case 'linux' | 'freebsd' | 'macos':
-                        cmd = ' '.join([
-                            self.configurator.config['bedtools'], 'bamtobed',
-                            '-i', sample.bam_filepath,
-                            '|', os.path.join('/', 'bin', 'cut'), '-f1,2,3,5',
-                            '|', 'uniq', '-u',
-                            '>', self.coords])
-
-                    case 'windows':
-                        cmd = ' '.join([
-                            self.configurator.config['bedtools'], 'bamtobed',
-                            '-i', sample.bam_filepath,
-                            '|', 'powershell', '-Command',
-                            "\"ForEach-Object { $fields = $_ -split '`t';",
-                            '"$($fields[0])`t'
-                            '$($fields[1])`t'
-                            '$($fields[2])`t'
-                            '$($fields[4])" }',
-                            f'| Set-Content {self.coords}"'])
-
-                    case _:
-                        self.logger.warning(
-                            "There is no any native way to "
-                            "build a comand for '%s'. "
-                            "Please edit '%s' script to execute it properly",
-                            self.configurator.config['bedtools'],
-                            self.__module__)
-
-                        sys.exit(os.EX_USAGE)
-
-                execute(executor, cmd)
+                self._write_bam_coords(sample.bam_filepath, self.coords)
 
             except (
                 SystemError,
@@ -566,20 +1115,34 @@ class AmpliconCoverageDataPreparator(LoggerMixin, IDataPreparator):
                     self.perform.__func__.__name__)
                 raise e
 
-        with open(self.coords, 'r', encoding='utf-8') as fd:
-            for data in map(str.strip, fd.readlines()):
-                if data.startswith('#') or data.startswith(';'):
-                    continue
-                chrom, start, end = data.split('\t')[:3]
-                chrom = chrom.replace('chr', '')
-                if chrom in self.mpileup_files:
-                    mpileup = self.mpileup_files[chrom]
-                    cov_value = round(
-                        self.count_region_coverage(
-                            mpileup, chrom, start, end
-                            ), 3)
-
-                    self.results.append(cov_value)
-                else:
-                    continue
+        chroms, starts, ends = self._read_coords()
+        contigs = numpy.unique(chroms)
+
+        # The mpileup files are parsed concurrently, since the C parser
+        # of pandas releases the GIL while it tokenizes
+        with ThreadPoolExecutor(
+            max_workers=max(1, min(self.threads, len(contigs)))
+        ) as pool:
+            loads = [
+                pool.submit(self._load_mpileup, self.mpileup_files[chrom])
+                for chrom in contigs]
+
+        for load in loads:
+            try:
+                load.result()
+            except FileNotFoundError:
+                # Reported when the regions of the contig are counted
+                continue
+
+        # Regions of a contig are counted together, the results
+        # keep the order of the coords file
+        coverages = numpy.zeros(len(chroms))
+        for chrom in contigs:
+            on_contig = chroms == chrom
+            coverages[on_contig] = self.count_regions_coverage(
+                self.mpileup_files[chrom], chrom,
+                starts[on_contig], ends[on_contig])
+
+        self.results.extend(round(float(value), 3) for value in coverages)
+
         return self.results
@@ -15,6 +15,7 @@ Main Features:
     - Annotates VCF files with variant effect predictions.
     - Generates summary reports in HTML and CSV formats.
     - Supports integration with command execution frameworks.
+    - Can stream the annotated VCF to stdout for piping.
 """
 
 # region Imports
@@ -29,6 +30,7 @@ from src.core.base import LoggerMixin
 from src.core.base import CommandExecutor
 from src.core.base import execute
 from src.core.base import insert_processing_infix
+from src.core.jvm_server import java_command
 
 from src.core.sample_data_container import SampleDataContainer
 # endregion
@@ -77,6 +79,36 @@ class SnpEffAnnotationAdapter(LoggerMixin, IAnnotationAdapter):
         self.configurator = configurator
         super().__init__(logger=self.configurator.logger)
 
+    def build_command(
+        self,
+        sample: SampleDataContainer,
+        reference_ident: str
+    ) -> list[str]:
+        """Builds the SnpEff command writing the annotated VCF to stdout,
+            so it can be piped into the next stage.
+
+        Args:
+            sample (SampleDataContainer):
+                The sample with VCF data to annotate.
+            reference_ident (str):
+                The reference genome or database identifier.
+
+        Returns:
+            list[str]:
+                The command arguments.
+        """
+        html_stats_path = os.path.join(
+            sample.processing_logpath, f"{sample.sid}_snpEff_summary.html")
+
+        csv_stats_path = os.path.join(
+            sample.processing_logpath, f"{sample.sid}_snpEff_summary.csv")
+
+        return [
+            *java_command(self.configurator, 'snpeff'), reference_ident,
+            '-stats', os.path.abspath(html_stats_path),
+            '-csvStats', os.path.abspath(csv_stats_path),
+            os.path.abspath(sample.vcf_filepath)]
+
     def annotate(
         self,
         sample: SampleDataContainer,
@@ -99,19 +131,8 @@ class SnpEffAnnotationAdapter(LoggerMixin, IAnnotationAdapter):
         """
         annotated_vcf = insert_processing_infix('.ann', sample.vcf_filepath)
 
-        html_stats_path = os.path.join(
-            sample.processing_logpath, f"{sample.sid}_snpEff_summary.html")
-
-        csv_stats_path = os.path.join(
-            sample.processing_logpath, f"{sample.sid}_snpEff_summary.csv")
-
-        cmd = ' '.join([
-            self.configurator.config['java'], '-jar',
-            self.configurator.config['snpeff'], reference_ident,
-            '-stats', html_stats_path,
-            '-csvStats', csv_stats_path,
-            sample.vcf_filepath, '>', annotated_vcf])
-
-        execute(executor, cmd)
+        execute(
+            executor, self.build_command(sample, reference_ident),
+            stdout=annotated_vcf)
 
-        return insert_processing_infix('.ann', sample.vcf_filepath)
+        return annotated_vcf
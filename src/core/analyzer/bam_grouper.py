@@ -5,14 +5,18 @@ Classes:
     - BamGrouper:
         Converts SAM files to sorted BAM files,
         adds read group information, and indexes
-        the BAM files using Picard tools.
+        the BAM files using samtools.
 
 Main Functionality:
     - Takes a sample's SAM file output from mapping.
-    - Uses Picard tools to add read groups, sort the BAM file, \
+    - Uses samtools to add read groups, sort the BAM file, \
     and create an index.
     - Produces space-efficient, indexed BAM files optimized
     for downstream analysis and fast interaction.
+    - Can read alignments straight from an upstream command's stdout,
+    so the mapping output never hits the disk as a SAM file.
+    - Sorts records tagged by the aligner without
+    a separate read group pass.
 
 This class is designed to streamline BAM file
 preparation steps in sequencing pipelines,
@@ -21,17 +25,18 @@ improving efficiency and facilitating downstream processing.
 
 # region Imports
 import os
-import datetime
 
 from os import PathLike
-from typing import Union, AnyStr
+from typing import Union, AnyStr, Optional
 
 from src.configurator import Configurator
 
 from src.core.base import LoggerMixin
 from src.core.base import CommandExecutor
 
+from src.core.base import Stream
 from src.core.base import execute
+from src.core.base import execute_pipeline
 
 from src.core.sample_data_container import SampleDataContainer
 
@@ -42,7 +47,7 @@ from src.core.analyzer.i_data_preparator import IDataPreparator
 class BamGrouper(LoggerMixin, IDataPreparator):
     """The BamGrouper class handles the conversion of SAM files
     to sorted BAM files, adds read group information, and
-    indexes the BAM files using Picard tools.
+    indexes the BAM files using samtools.
 
     BAM files are more space-efficient,
     faster for interaction, and support indexing.
@@ -50,25 +55,46 @@ class BamGrouper(LoggerMixin, IDataPreparator):
 
     def __init__(
         self,
-        configurator: Configurator
+        configurator: Configurator,
+        threads: Optional[int] = None
     ):
         """Initializes the BamGrouper with the provided configuration.
 
         Args:
             configurator:
                 Configuration object containing paths and parameters.
+            threads (int, optional):
+                Number of sorting threads.
+                Defaults to the '--threads' argument.
         """
         super().__init__(logger=configurator.logger)
         self.configurator = configurator
+        self.threads = threads or configurator.args.threads
+        # Samples sorted simultaneously share the available RAM
+        self.workers = 1
+
+        self._compression = configurator.parse_optional_configuration(
+            'Compression', defaults={
+                'level': '1', 'pipe-level': '0', 'format': 'bam'})
+        self._cram_output = self._compression['format'].lower() == 'cram'
 
     def perform(
         self,
         sample: SampleDataContainer,
-        executor: Union[CommandExecutor, callable]
+        executor: Union[CommandExecutor, callable],
+        upstream: Optional[Union[list[Union[list[str], str]], str]] = None,
+        upstream_stderr: Optional[list[Stream]] = None,
+        upstream_read_group: bool = False
     ) -> tuple[PathLike[AnyStr], PathLike[AnyStr]]:
         """Conversion of the read mapping output on the reference (SAM file)
         to a BAM file, sorting of reads, addition of read group information,
-        and indexing of the BAM file using Picard.
+        and indexing of the BAM file using samtools.
+
+        Read groups are added on the fly and the records are streamed
+        into 'samtools sort', so no intermediate file is written.
+        With 'format = cram' in the 'Compression' section the sorted
+        alignments are written as CRAM 3.1 against the reference,
+        which is several times smaller than BAM.
 
         BAM files occupy less disk space,
         and due to indexing and their binary format,
@@ -80,47 +106,125 @@ class BamGrouper(LoggerMixin, IDataPreparator):
             executor (Union[CommandExecutor, callable]):
                 The parameter is an external callable object or a
                 special class to handling or/and wrapping system calls.
+            upstream (list[Union[list[str], str]], optional):
+                Commands writing SAM records to stdout (e.g. the aligner),
+                connected by pipes. If given, their output is piped
+                into samtools instead of reading 'sample.bam_filepath'
+                from the disk. A single shell command line is accepted too.
+            upstream_stderr (list[Stream], optional):
+                Stderr targets of the upstream commands, one per command.
+            upstream_read_group (bool, optional):
+                Whether the upstream records already carry the read group
+                of 'sample.read_group_line' (e.g. added by the aligner).
+                If set, the records go straight into the sort.
         Returns:
             tuple: A pair of paths -
                 (index_path, bam_path)
-                where index_path is the path to the BAM index file (.bai),
-                and bam_path is the path to the sorted BAM file.
+                where index_path is the path to the index file
+                (.bai or .crai), and bam_path is the path
+                to the sorted BAM (or CRAM) file.
         """
+        samtools = self.configurator.config['samtools']
+
+        logpaths = {
+            command: os.path.join(
+                sample.paths.logdir, f"samtools-{command}.log")
+            for command in ('addreplacerg', 'sort', 'index')}
+
+        index_outpath, grouping_outpath = self.output_paths(sample)
+
+        compression = self._compression
+
+        if self._cram_output:
+            output_format = [
+                '-O', 'cram,version=3.1',
+                '--reference', self.configurator.config['reference']]
+        else:
+            output_format = []
+
+        add_read_groups_cmd = [
+            samtools, 'addreplacerg',
+            *[arg for field in sample.read_group_fields()
+              for arg in ('-r', field)],
+            # Uncompressed by default, since it is only piped into the sort
+            '-O', f"BAM,level={compression['pipe-level']}",
+            '-o', '-',
+            '-' if upstream else os.path.join(
+                sample.processing_path,
+                sample.bam_filepath,
+            )]
 
-        picard_grouping_logpath = os.path.abspath(os.path.join(
-            sample.processing_logpath,
-            f"{os.path.splitext(
-                os.path.basename(self.configurator.config['picard'])
-                )[0]}-AddOrReplaceReadGroups.log")
-            )
+        sort_memory = self.configurator.sort_memory_per_thread(
+            self.threads * self.workers)
 
-        picard_grouping_outpath = os.path.join(
-            sample.processing_path, f"{sample.sid}.sorted.read_groups")
+        # The memory share keeps the whole sort in RAM when it fits,
+        # otherwise it spills to lots of small temporary files
+        sort_cmd = [
+            samtools, 'sort',
+            '-@', str(self.threads),
+            '-m', f"{sort_memory}M",
+            '-l', compression['level'],
+            *output_format,
+            '-T', os.path.join(sample.processing_path, f"{sample.sid}.sort"),
+            '-o', grouping_outpath,
+            '-']
 
-        group_reads_cmd = ' '.join([
-            self.configurator.config['java'], '-jar', '-Xmx8g',
-            self.configurator.config['picard'], 'AddOrReplaceReadGroups',
-            '-INPUT', os.path.join(
-                sample.processing_path,
-                sample.bam_filepath,
-            ),
-            '-OUTPUT', picard_grouping_outpath+'.bam',
-            '-SORT_ORDER', 'coordinate',
-            '-CREATE_INDEX', 'TRUE',
-            '2>', picard_grouping_logpath,
-            '-RGDT', str(datetime.date.today()),
-            '-RGLB', 'MiSeq',
-            '-RGPL', 'Illumina',
-            '-RGPU', 'barcode',
-            '-RGSM', f"{sample.sid}"])
+        if isinstance(upstream, str):
+            upstream = [upstream]
+
+        upstream = upstream or []
 
         self.configurator.logger.info("Start grouping aligned reads")
-        self.configurator.logger.debug("Command: %s", group_reads_cmd)
 
-        execute(executor, group_reads_cmd)
+        # The processes are connected by pipes directly,
+        # and a failure of any of them fails the stage
+        upstream_stderr = upstream_stderr or [None] * len(upstream)
+
+        if upstream and upstream_read_group:
+            commands = [*upstream, sort_cmd]
+            stderr = [*upstream_stderr, logpaths['sort']]
+        else:
+            commands = [*upstream, add_read_groups_cmd, sort_cmd]
+            stderr = [
+                *upstream_stderr,
+                logpaths['addreplacerg'], logpaths['sort']]
+
+        execute_pipeline(executor, commands, stderr=stderr, check=True)
+
+        # BGZF blocks are decompressed by several threads
+        execute(
+            executor, [
+                samtools, 'index',
+                '-@', str(self.threads),
+                grouping_outpath,
+                index_outpath],
+            stderr=logpaths['index'], check=True)
 
         self.configurator.logger.info(
             "Grouping reads has successfully done. See the log at '%s'",
-            picard_grouping_logpath)
+            logpaths['sort'])
+
+        return index_outpath, grouping_outpath
+
+    def output_paths(
+        self,
+        sample: SampleDataContainer
+    ) -> tuple[PathLike[AnyStr], PathLike[AnyStr]]:
+        """Returns the paths 'perform' writes the sample's
+        sorted alignments to, without running anything.
+
+        Args:
+            sample (SampleDataContainer):
+                The container with sample's data.
+
+        Returns:
+            tuple: A pair of paths - (index_path, bam_path),
+                the same as 'perform' returns.
+        """
+        grouping_outpath = os.path.join(
+            sample.processing_path, f"{sample.sid}.sorted.read_groups")
+
+        if self._cram_output:
+            return grouping_outpath+'.crai', grouping_outpath+'.cram'
 
-        return (picard_grouping_outpath + ext for ext in [".bai", ".bam"])
+        return grouping_outpath+'.bai', grouping_outpath+'.bam'
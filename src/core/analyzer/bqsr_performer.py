@@ -17,18 +17,24 @@
             and handling input/output files.
 
     Main Features:
-        - Constructs command-line strings for GATK tools.
+        - Constructs argument lists for GATK tools.
         - Executes commands with logging and error handling.
         - Handles input sample data and target regions.
-        - Renames output files post-processing.
+        - Lets ApplyBQSR index the recalibrated BAM while writing it.
+        - Skips the recalibration if an indexed recalibrated BAM
+        is left by a previous run.
+        - Passes the JVM options and the temporary directory
+        of the 'GATK' section to both tools.
 """
 
 # region Imports
 import os
-import sys
+import shlex
+import logging
+import subprocess
 
 from os import PathLike
-from typing import Union, AnyStr
+from typing import Union, AnyStr, Optional
 
 from src.configurator import Configurator
 
@@ -37,6 +43,7 @@ from src.core.base import CommandExecutor
 
 from src.core.base import insert_processing_infix
 from src.core.base import execute
+from src.core.base import outputs_exist
 
 from src.core.sample_data_container import SampleDataContainer
 
@@ -70,10 +77,70 @@ class BQSRPerformer(LoggerMixin, IDataPreparator):
         super().__init__(logger=configurator.logger)
         self.configurator = configurator
 
+        self._gatk_name = os.path.basename(configurator.config['gatk'])
+
+        gatk_options = configurator.parse_optional_configuration(
+            'GATK', defaults={
+                'tmp-dir': '',
+                'java-options': '-XX:ParallelGCThreads=2'})
+
+        self._compression_level = configurator.parse_optional_configuration(
+            'Compression', defaults={'level': '1'})['level']
+
+        self._tmp_dir = gatk_options['tmp-dir']
+
+        # Number of samples recalibrated at once,
+        # they share the free space of '/dev/shm'
+        self.workers = 1
+        self._java_options = gatk_options['java-options']
+
+        # Known sites are a comma separated list, the annotation
+        # database is used if none are given
+        known_sites = configurator.parse_optional_configuration(
+            'BQSR', defaults={
+                'known-sites': configurator.config['annotation-database']
+            })['known-sites']
+
+        self._known_sites = [
+            path.strip() for path in known_sites.split(',') if path.strip()]
+
+    def _tmp_dirpath(
+        self,
+        sample: SampleDataContainer
+    ) -> Optional[PathLike[AnyStr]]:
+        """Chooses the directory GATK writes its temporary files to.
+
+            The 'tmp-dir' option of the 'GATK' section is used if set.
+            Otherwise '/dev/shm' is used if its share of free space
+            for every sample recalibrated at once (see 'workers')
+            is more than the size of the sample's alignments.
+
+            Args:
+                sample (SampleDataContainer):
+                    The sample to process.
+
+            Returns:
+                PathLike[AnyStr]:
+                    The directory, or None to leave GATK's default.
+        """
+        if self._tmp_dir:
+            return self._tmp_dir
+
+        try:
+            shm = os.statvfs('/dev/shm')
+            if shm.f_bavail * shm.f_frsize // max(1, self.workers) > \
+                    os.path.getsize(sample.bam_filepath):
+                return '/dev/shm'
+        except OSError:
+            pass
+
+        return None
+
     def perform(
         self,
         sample: SampleDataContainer,
-        executor: Union[CommandExecutor, callable]
+        executor: Union[CommandExecutor, callable],
+        intervals: Optional[PathLike[AnyStr]] = None
     ) -> PathLike[AnyStr]:
         """Executes BQSR using GATK's BaseRecalibrator and ApplyBQSR.
 
@@ -82,6 +149,10 @@ class BQSRPerformer(LoggerMixin, IDataPreparator):
                     The sample data to process.
                 executor (Union[CommandExecutor, callable]):
                     Function or object to run commands.
+                intervals (PathLike[AnyStr], optional):
+                    BED file limiting the regions BaseRecalibrator
+                    collects covariates from. ApplyBQSR still writes
+                    all reads.
 
             Returns:
                 PathLike[AnyStr]:
@@ -91,63 +162,89 @@ class BQSRPerformer(LoggerMixin, IDataPreparator):
                 Propagates exceptions from command execution
                 or file operations.
         """
-        base_recal_logpath = os.path.abspath(os.path.join(
-            sample.processing_logpath,
-            f"{os.path.basename(
-                self.configurator.config['gatk'])}-BaseRecalibrator.log"))
+        config = self.configurator.config
 
-        racalibration_table_path = os.path.abspath(os.path.join(
-            sample.processing_path, f"{sample.sid}.table"))
+        logdir = sample.paths.logdir
+        base_recal_logpath, apply_bqsr_logpath = (
+            os.path.join(logdir, f"{self._gatk_name}-{tool}.log")
+            for tool in ('BaseRecalibrator', 'ApplyBQSR'))
 
-        base_recal_cmd_str = ' '.join([
-            self.configurator.config['gatk'], 'BaseRecalibrator',
+        racalibration_table_path = os.path.join(
+            sample.paths.processing_dir, f"{sample.sid}.table")
+
+        # The input may be CRAM, but the variant caller reads BAM only
+        recalibrated_outpath = os.path.splitext(insert_processing_infix(
+            '.recalibrated', sample.bam_filepath))[0]+'.bam'
+
+        # The index is moved in place after ApplyBQSR has finished,
+        # so its presence means the BAM is complete
+        if outputs_exist(recalibrated_outpath, recalibrated_outpath+'.bai'):
+            self.logger.info(
+                "Recalibrated BAM '%s' already exists, skipping BQSR",
+                recalibrated_outpath)
+            return recalibrated_outpath
+
+        compression_level = self._compression_level
+
+        tmp_dirpath = self._tmp_dirpath(sample)
+
+        shared_args = [
             '--input', sample.bam_filepath,
-            '--output', racalibration_table_path,
-            '--reference', self.configurator.config['reference'],
-            # TODO: Have to make it works with a list of sites
-            '--known-sites', self.configurator.config['annotation-database'],
-            # ' '.join(
-            #     [f"--intervals {interval}" for interval in
-            #         [sample.target_regions[i][0] for i in range(
-            #             len(sample.target_regions))]]),
-            '2>', base_recal_logpath,
-            '>>', base_recal_logpath])
+            '--reference', config['reference'],
+            *(['--tmp-dir', tmp_dirpath] if tmp_dirpath else [])]
+
+        base_recal_cmd = [
+            config['gatk'],
+            '--java-options', self._java_options,
+            'BaseRecalibrator',
+            *shared_args,
+            *(['--intervals', intervals] if intervals else []),
+            *[arg for known_sites in self._known_sites
+              for arg in ('--known-sites', known_sites)],
+            '--output', racalibration_table_path]
+
+        # ApplyBQSR is not limited to the intervals,
+        # so no reads are dropped from its output
+        apply_bqsr_cmd = [
+            config['gatk'],
+            '--java-options', ' '.join([
+                self._java_options,
+                f"-Dsamjdk.compression_level={compression_level}"]),
+            'ApplyBQSR',
+            *shared_args,
+            '--bqsr-recal-file', racalibration_table_path,
+            '--create-output-bam-index', 'true',
+            '--output', recalibrated_outpath]
 
         try:
             self.logger.info(
                 "Executing BaseRecalibrator command")
-            self.configurator.logger.debug(
-                "Command: %s",
-                base_recal_cmd_str)
+            if self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug("Command: %s", shlex.join(base_recal_cmd))
 
-            execute(executor, base_recal_cmd_str)
+            execute(
+                executor, base_recal_cmd,
+                stdout=base_recal_logpath, stderr=subprocess.STDOUT,
+                check=True)
 
             self.configurator.logger.info(
                 f"BaseRecalibrator completed successfully. "
                 f"See the log at '{base_recal_logpath}'")
 
-            recalibrated_outpath = insert_processing_infix(
-                '.recalibrated', sample.bam_filepath)
-
-            apply_bqsr_logpath = base_recal_logpath.replace(
-                'BaseRecalibrator', 'ApplyBQSR')
-
-            # Construct the ApplyBQSR command by
-            # modifying the original BaseRecalibrator command string
-            apply_bqsr_cmd_str = ' '.join([
-                base_recal_cmd_str
-                .replace('BaseRecalibrator', 'ApplyBQSR')
-                .replace(racalibration_table_path, recalibrated_outpath)
-                .replace(base_recal_logpath, apply_bqsr_logpath)
-                .replace('--known-sites', '')
-                .replace(self.configurator.config['annotation-database'], ''),
-                '--bqsr-recal-file', racalibration_table_path])
-
             self.logger.info("Executing ApplyBQSR command")
-            self.logger.debug("Command: %s", apply_bqsr_cmd_str)
+            if self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug("Command: %s", shlex.join(apply_bqsr_cmd))
+
+            execute(
+                executor, apply_bqsr_cmd,
+                stdout=apply_bqsr_logpath, stderr=subprocess.STDOUT,
+                check=True)
 
-            execute(executor, apply_bqsr_cmd_str)
-            os.rename(sample.bam_filepath, recalibrated_outpath)
+            # GATK names the index '<name>.bai', the rest of the pipeline
+            # expects '<name>.bam.bai' next to the BAM
+            os.replace(
+                os.path.splitext(recalibrated_outpath)[0]+'.bai',
+                recalibrated_outpath+'.bai')
 
             self.logger.info(
                 "ApplyBQSR completed successfully. See the log at '%s'",
@@ -160,7 +257,8 @@ class BQSRPerformer(LoggerMixin, IDataPreparator):
             IOError,
             SystemError,
             FileNotFoundError,
-            PermissionError
+            PermissionError,
+            subprocess.CalledProcessError
         ) as e:
             self.logger.critical(
                 "Error '%s' occurred at line '%s' during BQSR",
@@ -168,4 +266,4 @@ class BQSRPerformer(LoggerMixin, IDataPreparator):
                 e.__traceback__.tb_frame.f_lineno
             )
 
-            sys.exit(os.EX_SOFTWARE)
+            raise
@@ -7,6 +7,8 @@ Classes:
         scripts on sequencing samples.
     - PTrimmer:
         Performs primer sequence trimming from paired-end reads.
+    - Fastp:
+        Trims primer sequences with multithreaded fastp.
     - PrimerCutter:
         Factory class for creating instances of primer-related
         data preparators based on specified cutter type.
@@ -19,7 +21,9 @@ Purpose:
 
 # region Imports
 import os
+import shlex
 import logging
+import subprocess
 
 from os import PathLike
 from typing import Optional, Union, AnyStr
@@ -31,6 +35,7 @@ from src.core.base import CommandExecutor
 
 from src.core.base import execute
 from src.core.base import insert_processing_infix
+from src.core.base import outputs_exist
 
 from src.core.sample_data_container import SampleDataContainer
 
@@ -44,9 +49,14 @@ class CutPrimers(LoggerMixin, IDataPreparator):
     and logs progress.
     """
 
-    def __init__(self, configurator: Configurator):
+    def __init__(
+        self,
+        configurator: Configurator,
+        threads: Optional[int] = None
+    ):
         super().__init__(logger=configurator.logger)
         self.configurator = configurator
+        self.threads = threads or configurator.args.threads
 
     def perform(
         self,
@@ -78,12 +88,6 @@ class CutPrimers(LoggerMixin, IDataPreparator):
         primer_cutter_logpath = os.path.join(
             sample.processing_logpath, 'cutPrimers.log')
 
-        if not os.path.exists(os.path.dirname(primer_cutter_logpath)):
-            os.makedirs(os.path.dirname(primer_cutter_logpath))
-        if not os.path.exists(primer_cutter_logpath):
-            with open(primer_cutter_logpath, 'a', encoding='utf-8'):
-                pass
-
         tr1 = os.path.join(
             sample.processing_path, os.path.basename(sample.r1_source))
         tr1 = insert_processing_infix('.trimmed', tr1)
@@ -100,21 +104,33 @@ class CutPrimers(LoggerMixin, IDataPreparator):
             sample.processing_path, os.path.basename(sample.r2_source))
         utr2 = insert_processing_infix('.untrimmed', utr2)
 
-        cmd = ' '.join([
+        if outputs_exist(tr1, tr2):
+            self.configurator.logger.info(
+                "Trimmed reads of sample '%s' already exist, "
+                "skipping cutPrimers",
+                sample.sid)
+            return tr1, tr2
+
+        # Trimmed reads are written under temporary names and renamed
+        # once complete, so a failed run isn't taken for a finished one
+        partial_tr1, partial_tr2 = (
+            insert_processing_infix('.partial', path) for path in (tr1, tr2))
+
+        cmd = [
             self.configurator.config['python'],
             self.configurator.config['cutprimers'],
             '-r1',   sample.r1_source,
-            '-tr1',  tr1,
+            '-tr1',  partial_tr1,
             '-utr1', utr1,
             '-r2',   sample.r2_source,
-            '-tr2',  tr2,
+            '-tr2',  partial_tr2,
             '-utr2', utr2,
             '-pr15', self.configurator.config['primer15'],
             '-pr13', self.configurator.config['primer13'],
             '-pr25', self.configurator.config['primer25'],
             '-pr23', self.configurator.config['primer23'],
             '-stat', primer_cutter_logpath,
-            '-t',    str(self.configurator.args.threads)])
+            '-t',    str(self.threads)]
 
         # '''cmd_bam = ' '.join([
         #   self.configurator.config['python'],
@@ -134,9 +150,13 @@ class CutPrimers(LoggerMixin, IDataPreparator):
         # '''
 
         self.configurator.logger.info("Executing cutPrimers command")
-        self.configurator.logger.debug("Command: %s", cmd)
+        if self.configurator.logger.isEnabledFor(logging.DEBUG):
+            self.configurator.logger.debug("Command: %s", shlex.join(cmd))
 
-        execute(executor, cmd)
+        execute(executor, cmd, check=True)
+
+        os.replace(partial_tr1, tr1)
+        os.replace(partial_tr2, tr2)
 
         self.configurator.logger.info(
             "cutPrimers completed successfully. See the log at '%s'",
@@ -175,14 +195,6 @@ class PTrimmer(LoggerMixin, IDataPreparator):
         primer_cutter_logpath = os.path.join(
             sample.processing_logpath, 'pTrimmer.log')
 
-        if not os.path.exists(os.path.dirname(primer_cutter_logpath)):
-            os.makedirs(os.path.abspath(
-                os.path.dirname(primer_cutter_logpath)))
-
-        if not os.path.exists(primer_cutter_logpath):
-            with open(primer_cutter_logpath, 'a', encoding='utf-8'):
-                pass
-
         r1_trimmed = os.path.join(
             sample.processing_path, insert_processing_infix(
                 '.trimmed', os.path.basename(sample.r1_source)))
@@ -190,26 +202,44 @@ class PTrimmer(LoggerMixin, IDataPreparator):
             sample.processing_path, insert_processing_infix(
                 '.trimmed', os.path.basename(sample.r2_source)))
 
-        cmd = ' '.join([
+        if outputs_exist(r1_trimmed, r2_trimmed):
+            self.configurator.logger.info(
+                "Trimmed reads of sample '%s' already exist, "
+                "skipping pTrimmer",
+                sample.sid)
+            return r1_trimmed, r2_trimmed
+
+        # Trimmed reads are written under temporary names and renamed
+        # once complete, so a failed run isn't taken for a finished one
+        r1_partial, r2_partial = (
+            insert_processing_infix('.partial', path)
+            for path in (r1_trimmed, r2_trimmed))
+
+        cmd = [
             self.configurator.config['ptrimmer'],
             '--seqtype', 'pair',
             '--ampfile', self.configurator.config['ampfile'],
             '--read1', sample.r1_source,
-            '--trim1', r1_trimmed,
+            '--trim1', r1_partial,
             '--read2', sample.r2_source,
-            '--trim2', r2_trimmed,
+            '--trim2', r2_partial,
             '--summary', os.path.join(
                 sample.processing_logpath, 'pTrimmer.summary'),
             '--mismatch', str(1),
             '--kmer', str(4),
-            '>', primer_cutter_logpath,
-            '2>&1',
-            '--gzip'])
+            '--gzip']
 
         self.configurator.logger.info("Executing pTrimmer command")
-        self.configurator.logger.debug("Command: %s", cmd)
+        if self.configurator.logger.isEnabledFor(logging.DEBUG):
+            self.configurator.logger.debug("Command: %s", shlex.join(cmd))
 
-        execute(executor, cmd)
+        execute(
+            executor, cmd,
+            stdout=primer_cutter_logpath, stderr=subprocess.STDOUT,
+            check=True)
+
+        os.replace(r1_partial, r1_trimmed)
+        os.replace(r2_partial, r2_trimmed)
 
         self.configurator.logger.info(
             "pTrimmer completed successfully. See the log at '{}'".format(
@@ -218,6 +248,189 @@ class PTrimmer(LoggerMixin, IDataPreparator):
         return r1_trimmed, r2_trimmed
 
 
+class Fastp(LoggerMixin, IDataPreparator):
+    """Class responsible for trimming primer sequences
+    from paired-end reads with fastp.
+
+    fastp has no 5' primer matching, so the 5' primers are cut
+    as a fixed number of leading bases ('--trim_front1/2'),
+    which needs all 5' primers of a mate to be of the same length.
+    The 3' primers are cut like adapters, from the match to the end
+    of a read, so they are collected into a FASTA file shared
+    by all samples.
+    """
+
+    def __init__(
+        self,
+        configurator: Configurator,
+        threads: Optional[int] = None
+    ):
+        super().__init__(logger=configurator.logger)
+        self.configurator = configurator
+        self.threads = threads or configurator.args.threads
+
+        self._compression_level = configurator.parse_optional_configuration(
+            'Compression', defaults={'level': '1'})['level']
+
+        self.primers_fasta = os.path.join(
+            configurator.output_dir, 'primers.fa')
+
+        # Primer files are read on the first use,
+        # so missing ones are reported by the tool check first
+        self._primer_argv = None
+
+    @staticmethod
+    def _read_primers(path: PathLike[AnyStr]) -> list[str]:
+        """Returns the sequences of a FASTA file with primers."""
+        with open(path, 'r', encoding='utf-8') as fd:
+            return [
+                line.strip() for line in fd
+                if line.strip() and not line.startswith('>')]
+
+    def primer_argv(self) -> list[str]:
+        """Builds the fastp options cutting the primers.
+
+            Returns:
+                list[str]:
+                    The options, built once per instance.
+
+            Raises:
+                ValueError:
+                    If the 5' primers of a mate differ in length,
+                    so they can't be cut as leading bases.
+        """
+        if self._primer_argv is not None:
+            return self._primer_argv
+
+        config = self.configurator.config
+
+        front = []
+        for option, key in (
+            ('--trim_front1', 'primer15'), ('--trim_front2', 'primer25')
+        ):
+            lengths = {len(primer) for primer in self._read_primers(
+                config[key])}
+            if len(lengths) != 1:
+                raise ValueError(
+                    f"fastp cuts 5' primers as leading bases, so primers "
+                    f"of '{config[key]}' must be of one length, "
+                    f"{sorted(lengths)} found. Use pTrimmer instead")
+            front.extend([option, str(lengths.pop())])
+
+        # Samples of a batch may start at once,
+        # so the file is replaced as a whole
+        partial_path = f"{self.primers_fasta}.{os.getpid()}"
+        with open(partial_path, 'w', encoding='utf-8') as out:
+            for key in ('primer13', 'primer23'):
+                for index, primer in enumerate(
+                    self._read_primers(config[key])
+                ):
+                    out.write(f">{key}_{index}\n{primer}\n")
+        os.replace(partial_path, self.primers_fasta)
+
+        self._primer_argv = [
+            *front, '--adapter_fasta', self.primers_fasta]
+
+        return self._primer_argv
+
+    def perform(
+        self,
+        sample: SampleDataContainer,
+        executor: Union[CommandExecutor, callable]
+    ) -> tuple[PathLike[AnyStr], PathLike[AnyStr]]:
+        """Performs primer trimming on the sample's read files.
+
+        Args:
+            sample (SampleDataContainer):
+                The sample data with source file paths.
+            executor (CommandExecutor or callable):
+                Executor for running commands.
+
+        Returns:
+            Tuple of paths to the trimmed R1 and R2 files.
+        """
+        fastp_logpath = self.logpath(sample)
+
+        r1_trimmed = os.path.join(
+            sample.processing_path, insert_processing_infix(
+                '.trimmed', os.path.basename(sample.r1_source)))
+        r2_trimmed = os.path.join(
+            sample.processing_path, insert_processing_infix(
+                '.trimmed', os.path.basename(sample.r2_source)))
+
+        if outputs_exist(r1_trimmed, r2_trimmed):
+            self.configurator.logger.info(
+                "Trimmed reads of sample '%s' already exist, skipping fastp",
+                sample.sid)
+            return r1_trimmed, r2_trimmed
+
+        # Trimmed reads are written under temporary names and renamed
+        # once complete, so a failed run isn't taken for a finished one
+        r1_partial, r2_partial = (
+            insert_processing_infix('.partial', path)
+            for path in (r1_trimmed, r2_trimmed))
+
+        cmd = self.build_argv(sample, [
+            '--out1', r1_partial,
+            '--out2', r2_partial,
+            '--compression', self._compression_level])
+
+        self.configurator.logger.info("Executing fastp command")
+        if self.configurator.logger.isEnabledFor(logging.DEBUG):
+            self.configurator.logger.debug("Command: %s", shlex.join(cmd))
+
+        execute(
+            executor, cmd, stdout=fastp_logpath, stderr=subprocess.STDOUT,
+            check=True)
+
+        os.replace(r1_partial, r1_trimmed)
+        os.replace(r2_partial, r2_trimmed)
+
+        self.configurator.logger.info(
+            "fastp completed successfully. See the log at '%s'",
+            fastp_logpath)
+
+        return r1_trimmed, r2_trimmed
+
+    def logpath(self, sample: SampleDataContainer) -> PathLike[AnyStr]:
+        """Returns the fastp log path in the sample's log directory."""
+        return os.path.join(sample.processing_logpath, 'fastp.log')
+
+    def build_argv(
+        self,
+        sample: SampleDataContainer,
+        outputs: Optional[list[str]] = None
+    ) -> list[str]:
+        """Builds the fastp command arguments.
+
+            Args:
+                sample (SampleDataContainer):
+                    The sample data with source file paths.
+                outputs (list[str], optional):
+                    Output options. If None, the trimmed pairs
+                    are written to stdout as interleaved FASTQ,
+                    so they can be piped into the aligner.
+
+            Returns:
+                list[str]:
+                    The command arguments.
+        """
+        return [
+            self.configurator.config['fastp'],
+            '--in1', sample.r1_source,
+            '--in2', sample.r2_source,
+            *(outputs if outputs is not None else ['--stdout']),
+            *self.primer_argv(),
+            '--thread', str(self.threads),
+            # Pairs left shorter than fastp's minimal length,
+            # e.g. primer dimers, are dropped as pTrimmer does
+            '--disable_quality_filtering',
+            '--json', os.path.join(
+                sample.processing_logpath, 'fastp.json'),
+            '--html', os.path.join(
+                sample.processing_logpath, 'fastp.html')]
+
+
 class PrimerCutter(LoggerMixin):
     """Factory class for creating primer-related data preparator instances.
     Provides a method to instantiate specific primer cutter
@@ -244,7 +457,8 @@ class PrimerCutter(LoggerMixin):
             configurator (Configurator):
                 Configuration object with parameters and logger.
             cutter_name (str):
-                Name of the cutter type ('cutprimers' or 'ptrimmer').
+                Name of the cutter type
+                ('cutprimers', 'ptrimmer' or 'fastp').
 
         Returns:
             IDataPreparator instance corresponding to the cutter.
@@ -254,6 +468,24 @@ class PrimerCutter(LoggerMixin):
                 return CutPrimers(configurator)
             case 'ptrimmer':
                 return PTrimmer(configurator)
+            case 'fastp':
+                return Fastp(configurator)
             case _:
                 raise NotImplementedError(
                     "There is no any cutter with name '%s'" % cutter_name)
+
+    @staticmethod
+    def default_cutter_name(configurator: Configurator) -> str:
+        """Returns the primer cutter chosen by 'primer-cutter'
+            of the 'Alignment' section, pTrimmer by default.
+
+        Args:
+            configurator (Configurator):
+                Configuration object with the 'Alignment' section.
+
+        Returns:
+            str: The name to pass to 'create_primer_cutter'.
+        """
+        return configurator.parse_optional_configuration(
+            'Alignment', defaults={'primer-cutter': 'ptrimmer'}
+        )['primer-cutter']
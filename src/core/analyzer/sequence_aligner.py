@@ -10,20 +10,30 @@
             Performs read alignment to a reference genome,
             logs the process, and returns the path
             to the aligned reads file.
+        - BWAAligner:
+            The same aligner driven by the classic BWA binary,
+            which can keep the reference index in shared memory.
 
     Main Features:
         - Constructs command-line instructions for BWA-MEM2.
+        - Runs the BWA-MEM2 build for the widest SIMD instruction set
+        supported by the CPU.
         - Ensures log directories exist.
         - Handles sample information and reference genome input.
         - Manages output paths for alignment results.
+        - Builds the reference index if it is missing.
+        - Builds a command streaming alignments to stdout,
+        so they can be piped into the next stage without a SAM file.
         - Implements error handling with logging.
 """
 
 # region Imports
 import os
+import shlex
+import logging
 
 from os import PathLike
-from typing import Union, AnyStr
+from typing import Union, AnyStr, Optional
 
 from src.core.base import LoggerMixin
 from src.core.base import CommandExecutor
@@ -33,6 +43,32 @@ from src.core.analyzer.i_data_preparator import IDataPreparator
 from src.core.sample_data_container import SampleDataContainer
 # endregion
 
+# Builds of bwa-mem2 from the widest SIMD instruction set to the narrowest,
+# with the CPU flag each of them requires
+_SIMD_BUILDS = (
+    ('avx512bw', 'avx512bw'),
+    ('avx2', 'avx2'),
+    ('sse42', 'sse4_2'),
+    ('sse41', 'sse4_1'))
+
+
+def _cpu_flags() -> set[str]:
+    """Reads the CPU feature flags from '/proc/cpuinfo'.
+
+        Returns:
+            set[str]:
+                The flags, empty if they can't be read.
+    """
+    try:
+        with open('/proc/cpuinfo', 'r', encoding='utf-8') as fd:
+            for line in fd:
+                if line.startswith('flags'):
+                    return set(line.split(':', 1)[1].split())
+    except OSError:
+        pass
+
+    return set()
+
 
 class SequenceAligner(LoggerMixin, IDataPreparator):
     """Class responsible for mapping sequencing reads to a reference genome.
@@ -40,16 +76,155 @@ class SequenceAligner(LoggerMixin, IDataPreparator):
         the mapping and logs the process.
     """
 
-    def __init__(self, configurator):
+    aligner_key = 'bwa-mem2'
+
+    # Files 'index' writes next to the reference
+    index_suffixes = ('.0123', '.amb', '.ann', '.bwt.2bit.64', '.pac')
+    # Peak memory of 'index' per byte of the reference
+    index_memory_factor = 28
+
+    def __init__(self, configurator, threads: Optional[int] = None):
         """Initializes the SequenceAligner with a configurator instance.
 
             Args:
                 configurator:
                     Configuration object containing paths,
                     parameters, and logger.
+                threads (int, optional):
+                    Number of aligner threads.
+                    Defaults to the '--threads' argument.
         """
         super().__init__(logger=configurator.logger)
         self.configurator = configurator
+        self.threads = threads or configurator.args.threads
+
+        # The log name only depends on the aligner,
+        # so it is not rebuilt for every sample
+        self._log_basename = os.path.basename(os.path.splitext(
+            configurator.config[self.aligner_key])[0]) + '-mem'
+
+        self.executable = self._select_executable()
+
+    def _select_executable(self) -> str:
+        """Picks the bwa-mem2 build for the widest SIMD instruction set
+            the CPU supports, if the builds lie next to the configured
+            executable. The configured executable is used otherwise.
+
+            Returns:
+                str:
+                    Path to the aligner executable.
+        """
+        launcher = self.configurator.config[self.aligner_key]
+        flags = _cpu_flags()
+
+        for suffix, flag in _SIMD_BUILDS:
+            executable = f"{launcher}.{suffix}"
+            if flag in flags and os.access(executable, os.X_OK):
+                self.logger.info("Using aligner executable '%s'", executable)
+                return executable
+
+        return launcher
+
+    def has_index(self, reference_source: PathLike[AnyStr]) -> bool:
+        """Checks whether the reference has been indexed by the aligner.
+
+            Args:
+                reference_source (PathLike[AnyStr]):
+                    Path to the reference genome file.
+
+            Returns:
+                bool:
+                    True if every index file lies next to the reference.
+        """
+        return all(
+            os.path.exists(f"{reference_source}{suffix}")
+            for suffix in self.index_suffixes)
+
+    def ensure_index(
+        self,
+        reference_source: PathLike[AnyStr],
+        executor: Union[CommandExecutor, callable]
+    ) -> None:
+        """Builds the reference index with the aligner's 'index' command
+            if it is missing, so it isn't discovered at alignment time.
+
+            Args:
+                reference_source (PathLike[AnyStr]):
+                    Path to the reference genome file.
+                executor (Union[CommandExecutor, callable]):
+                    Function or object to run commands.
+        """
+        if self.has_index(reference_source):
+            return
+
+        reference_size = os.path.getsize(reference_source)
+        self.logger.warning(
+            "Reference '%s' isn't indexed, building the index. "
+            "It may take up to %.1f GB of RAM",
+            reference_source,
+            self.index_memory_factor * reference_size / 1024**3)
+
+        execute(
+            executor, [self.executable, 'index', reference_source],
+            stderr=os.path.join(
+                self.configurator.output_dir,
+                os.path.basename(os.path.splitext(
+                    self.configurator.config[self.aligner_key])[0])
+                + '-index.log'),
+            check=True)
+
+        self.logger.info("Reference '%s' has been indexed", reference_source)
+
+    def logpath(self, sample: SampleDataContainer) -> PathLike[AnyStr]:
+        """Returns the aligner's log path in the sample's log directory."""
+        return os.path.join(sample.paths.logdir, self._log_basename+'.log')
+
+    def build_argv(
+        self,
+        sample: SampleDataContainer,
+        reference_source: PathLike[AnyStr],
+        outpath: Optional[PathLike[AnyStr]] = None,
+        reads: Optional[tuple[PathLike[AnyStr], PathLike[AnyStr]]] = None,
+        read_group: Optional[str] = None,
+        interleaved: bool = False
+    ) -> list[str]:
+        """Builds the reads mapping command arguments, with no redirection
+            of the aligner's stderr (see 'logpath').
+
+            Args:
+                sample (SampleDataContainer):
+                    The container holding sample's sequencing data.
+                reference_source (PathLike[AnyStr]):
+                    Path to the reference genome file.
+                outpath (PathLike[AnyStr], optional):
+                    Path to the output SAM file. If None, alignments
+                    are written to stdout to be piped into the next stage.
+                reads (tuple, optional):
+                    (R1, R2) paths to align instead of the sample's reads.
+                read_group (str, optional):
+                    '@RG' header line with escaped tabs.
+                    The aligner tags every record with its ID.
+                    Defaults to the sample's read group.
+                interleaved (bool, optional):
+                    Whether the reads are interleaved pairs in one file,
+                    e.g. ('-', None) for pairs piped from a trimmer.
+
+            Returns:
+                list[str]:
+                    The command arguments.
+        """
+        r1_source, r2_source = reads or (sample.r1_source, sample.r2_source)
+
+        return [
+            self.executable, 'mem',
+            '-M',
+            *(['-p'] if interleaved else []),
+            '-t', str(self.threads),
+            '-R', read_group or sample.read_group_line(),
+            reference_source,
+            r1_source,
+            *([r2_source] if r2_source else []),
+            *(['-o', outpath] if outpath is not None else [])]
 
     def perform(
         self,
@@ -77,43 +252,29 @@ class SequenceAligner(LoggerMixin, IDataPreparator):
                 PathLike[AnyStr]:
                     A path to mapped reads file
         """
-
-        aligning_logpath = os.path.abspath(os.path.join(
-            sample.processing_logpath, os.path.basename(
-                os.path.splitext(self.configurator.config['bwa-mem2'])[0]
-                ))+'-mem'+'.log')
-
-        if not os.path.exists(os.path.dirname(aligning_logpath)):
-            os.makedirs(os.path.dirname(aligning_logpath))
-
         try:
             aligning_outpath = os.path.abspath(
                 os.path.join(sample.processing_path, sample.sid+'.sam'))
 
-            reads_mapping_cmd = ' '.join([
-                self.configurator.config['bwa-mem2'], 'mem',
-                reference_source,
-                sample.r1_source,
-                sample.r2_source if not sample.r2_source else '',
-                '-o', aligning_outpath,
-                '-t', str(self.configurator.args.threads),
-                '2>', aligning_logpath,
-                '-M'])
+            reads_mapping_cmd = self.build_argv(
+                sample, reference_source, aligning_outpath)
 
             self.configurator.logger.info(
                 "Starting to map sample '%s' reads to reference '%s'",
                 sample.sid,
                 self.configurator.config['reference'])
 
-            self.configurator.logger.debug(
-                "Command: %s",
-                reads_mapping_cmd)
+            if self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug(
+                    "Command: %s", shlex.join(reads_mapping_cmd))
 
-            execute(executor, reads_mapping_cmd)
+            execute(
+                executor, reads_mapping_cmd,
+                stderr=self.logpath(sample), check=True)
 
             self.configurator.logger.info(
                 "Alignment completed successfully. See the log at '%s'",
-                aligning_logpath)
+                self.logpath(sample))
 
             return aligning_outpath
         except Exception as e:
@@ -124,91 +285,56 @@ class SequenceAligner(LoggerMixin, IDataPreparator):
             raise e
 
 
-class BWAAligner(LoggerMixin, IDataPreparator):
+class BWAAligner(SequenceAligner):
     """Class responsible for mapping sequencing reads to a reference genome.
-        Utilizes an aligner like BWA-MEM2 to perform
-        the mapping and logs the process.
+        Utilizes the classic BWA aligner, which needs less RAM
+        for the whole human genome index than BWA-MEM2.
     """
 
-    def __init__(self, configurator):
-        """Initializes the SequenceAligner with a configurator instance.
+    aligner_key = 'bwa'
 
-            Args:
-                configurator:
-                    Configuration object containing paths,
-                    parameters, and logger.
+    index_suffixes = ('.amb', '.ann', '.bwt', '.pac', '.sa')
+    index_memory_factor = 5.4
+
+    def _select_executable(self) -> str:
+        """Returns the configured executable, since BWA has no SIMD builds.
         """
-        super().__init__(logger=configurator.logger)
-        self.configurator = configurator
+        return self.configurator.config[self.aligner_key]
 
-    def perform(
+    def load_shared_index(
         self,
-        sample: SampleDataContainer,
         reference_source: PathLike[AnyStr],
         executor: Union[CommandExecutor, callable]
-    ) -> PathLike[AnyStr]:
-        """Mapping reads to the reference human genome.
+    ) -> None:
+        """Loads the reference index into shared memory with 'bwa shm'.
 
-            This is the stage at which, for each read, it is determined
-            where a similar sequence is located in the reference genome,
-            and their alignment is performed relative to each other.
+            'bwa mem' uses an index found in shared memory instead of
+            reading it from the disk, so a cohort pays for loading
+            the index only once.
 
             Args:
-                sample (SampleDataContainer):
-                    The container holding sample's sequencing data,
-                    including raw reads path.
                 reference_source (PathLike[AnyStr]):
-                    Path to the reference genome file to which reads
-                    will be aligned.
+                    Path to the indexed reference genome.
                 executor (Union[CommandExecutor, callable]):
-                    The parameter is an external callable object or a
-                    special class to handling or/and wrapping system calls.
-            Returns:
-                PathLike[AnyStr]:
-                    A path to mapped reads file
+                    Function or object to run commands.
         """
+        self.logger.info(
+            "Loading '%s' index into shared memory", reference_source)
 
-        aligning_logpath = os.path.abspath(os.path.join(
-            sample.processing_logpath, os.path.basename(
-                os.path.splitext(self.configurator.config['bwa'])[0]
-                ))+'-mem'+'.log')
+        execute(
+            executor, [
+                self.executable, 'shm', reference_source],
+            check=True)
 
-        if not os.path.exists(os.path.dirname(aligning_logpath)):
-            os.makedirs(os.path.dirname(aligning_logpath))
-
-        try:
-            aligning_outpath = os.path.abspath(
-                os.path.join(sample.processing_path, sample.sid+'.sam'))
-
-            reads_mapping_cmd = ' '.join([
-                self.configurator.config['bwa'], 'mem',
-                reference_source,
-                sample.r1_source,
-                sample.r2_source if not sample.r2_source else '',
-                '-o', aligning_outpath,
-                '-t', str(self.configurator.args.threads),
-                '2>', aligning_logpath,
-                '-M'])
-
-            self.configurator.logger.info(
-                "Starting to map sample '%s' reads to reference '%s'",
-                sample.sid,
-                self.configurator.config['reference'])
-
-            self.configurator.logger.debug(
-                "Command: %s",
-                reads_mapping_cmd)
-
-            execute(executor, reads_mapping_cmd)
-
-            self.configurator.logger.info(
-                "Alignment completed successfully. See the log at '%s'",
-                aligning_logpath)
+    def drop_shared_index(
+        self,
+        executor: Union[CommandExecutor, callable]
+    ) -> None:
+        """Removes the index loaded by 'load_shared_index'
+            from shared memory.
 
-            return aligning_outpath
-        except Exception as e:
-            self.configurator.logger.critical(
-                "A fatal error '%s' occurred at '%s'",
-                repr(e),
-                e.__traceback__.tb_frame)
-            raise e
+            Args:
+                executor (Union[CommandExecutor, callable]):
+                    Function or object to run commands.
+        """
+        execute(executor, [self.executable, 'shm', '-d'])
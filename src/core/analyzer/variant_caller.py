@@ -30,7 +30,9 @@
 # region Imports
 import os
 import sys
+import shlex
 import logging
+import subprocess
 
 from typing import Optional, Union
 
@@ -58,6 +60,9 @@ class VariantCaller(LoggerMixin, IVariantCaller):
         Attributes:
             configurator (Configurator):
                 Configuration object containing parameters and paths.
+            threads (int):
+                Number of threads the caller may use.
+                Defaults to the '--threads' argument.
     """
 
     def __init__(
@@ -75,6 +80,7 @@ class VariantCaller(LoggerMixin, IVariantCaller):
                     Logger for logging.
         """
         self.configurator = configurator
+        self.threads = configurator.args.threads
         super().__init__(
             logger=logger if logger else self.configurator.logger)
 
@@ -89,6 +95,28 @@ class VariantCaller(LoggerMixin, IVariantCaller):
             "Subclasses should implement this method."
         )
 
+    def call_variants(
+        self,
+        samples: list[SampleDataContainer],
+        executor: Union[CommandExecutor, callable]
+    ) -> list[str]:
+        """Performs variant calling for several samples.
+
+            Calls samples one by one, subclasses may override it
+            with a single invocation of the tool for the whole batch.
+
+            Args:
+                samples (list[SampleDataContainer]):
+                    Samples with BAM paths.
+                executor (Union[CommandExecutor, callable]):
+                    Command executor.
+
+            Returns:
+                list[str]:
+                    Paths to the output VCF files in the order of samples.
+        """
+        return [self.call_variant(sample, executor) for sample in samples]
+
 
 class PiscesVariantCaller(VariantCaller):
     """Variant caller implementation using Pisces.
@@ -99,6 +127,9 @@ class PiscesVariantCaller(VariantCaller):
         Methods:
             call_variant(sample, executor):
                 Performs variant calling and returns output VCF path.
+            call_variants(samples, executor):
+                Performs variant calling for a batch of samples
+                within a single Pisces run.
     """
 
     def __init__(
@@ -130,37 +161,82 @@ class PiscesVariantCaller(VariantCaller):
         """
         self.logger.info("Starting variant calling with Pisces")
 
-        base_logpath = os.path.join(sample.processing_logpath, 'PiscesLogs')
+        return self._run_pisces([sample], executor)[0]
+
+    def call_variants(
+        self,
+        samples: list[SampleDataContainer],
+        executor: Union[CommandExecutor, callable]
+    ) -> list[str]:
+        """Executes variant calling using a single Pisces run
+            for all samples' BAM files.
+
+            Pisces processes the BAM files in parallel
+            and loads the reference only once for the whole batch.
+
+        Args:
+            samples (list[SampleDataContainer]):
+                Samples with BAM paths.
+            executor (Union[CommandExecutor, callable]):
+                Command executor.
+
+        Returns:
+            list[str]:
+                Paths to the output VCF files in the order of samples.
+        """
+        self.logger.info(
+            "Starting variant calling with Pisces for %s samples",
+            len(samples))
+
+        return self._run_pisces(samples, executor)
 
-        cmd = ' '.join([
-            'DOTNET_SYSTEM_GLOBALIZATION_INVARIANT=1 '
-            'LD_LIBRARY_PATH="/usr/local/lib"'
-            if get_platform() == "linux" else '',
+    def _run_pisces(
+        self,
+        samples: list[SampleDataContainer],
+        executor: Union[CommandExecutor, callable]
+    ) -> list[str]:
+        """Runs Pisces on the samples' BAM files.
+
+        Returns:
+            list[str]:
+                Paths to the VCF files written next to every BAM file.
+        """
+        base_logpath = os.path.join(
+            samples[0].processing_logpath, 'PiscesLogs')
+
+        cmd = [
+            *([
+                'env', 'DOTNET_SYSTEM_GLOBALIZATION_INVARIANT=1',
+                'LD_LIBRARY_PATH=/usr/local/lib'
+            ] if get_platform() == "linux" else []),
             self.configurator.config['pisces'],
             # '--sbfilter' str(0.1),
             '--coveragemethod', 'exact',  # 'exact' (greedy) or 'approximate'.
             '--multiprocess', 'true',
-            '--gvcf false',
+            '--maxthreads', str(self.threads),
+            '--gvcf', 'false',
             '--minbasecallquality', str(1),  # 10
             '--minmapquality', str(1),  # 10
             '--minimumvariantfrequency', str(0.0001),  # 0.01
             '--minvariantqscore', str(1),
-            '--bampaths', sample.bam_filepath,
+            '--bampaths', ','.join(sample.bam_filepath for sample in samples),
             '--genomefolders', os.path.dirname(
-                self.configurator.config['reference']),
-            '2>&1'])
+                self.configurator.config['reference'])]
 
         self.logger.info("Executing Pisces command")
-        self.logger.debug("Command: %s", cmd)
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("Command: %s", shlex.join(cmd))
 
-        execute(executor, cmd)
+        execute(executor, cmd, stderr=subprocess.STDOUT, check=True)
 
         self.logger.info(
             "Variant calling successfully done. See it's log on %s",
             base_logpath
         )
 
-        return os.path.splitext(sample.bam_filepath)[0]+".vcf"
+        return [
+            os.path.splitext(sample.bam_filepath)[0]+".vcf"
+            for sample in samples]
 
 
 class UnifiedGenotyperVariantCaller(VariantCaller):
@@ -209,18 +285,17 @@ class FreebayesVariantCaller(VariantCaller):
             executor (Union[CommandExecutor, callable]): \
                 Command executor.
         """
-        cmd = ' '.join([
+        cmd = [
             self.configurator.config['freebayes'],
             '--fasta-reference', self.configurator.config['reference'],
             '--ploidy', str(4),
             '--standard-filters',
             '--min-alternate-fraction', str(0.01),  # default value is 0.05
             '--no-population-priors',
-            ' '.join([
-                f"--region {interval}" for interval in
-                [sample.target_regions[i][0] for i in range(
-                    len(sample.target_regions))]]),
+            *[
+                arg for region, _ in sample.target_regions
+                for arg in ('--region', region)],
             '--bam', sample.bam_filepath,  # input file
-            '--vcf', sample.vcf_filepath])  # output file
+            '--vcf', sample.vcf_filepath]  # output file
 
         execute(executor, cmd)
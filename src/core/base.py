@@ -10,11 +10,16 @@
         - ICommandExecutor:
             Protocol defining an interface for command execution.
         - CommandExecutor:
-            A class to execute system commands via a callable.
+            A class to execute system commands via subprocess
+            or a given callable, in the foreground or in the background.
         - execute:
             Utility function to run commands with an executor.
+        - execute_pipeline:
+            Utility function to run piped commands with an executor.
         - touch:
             Creates or updates the timestamp of a file.
+        - outputs_exist:
+            Checks whether a stage has already written its outputs.
         - insert_processing_infix:
             Inserts a string into a filename before its extension.
         - extract_archive:
@@ -31,8 +36,11 @@
 import os
 import sys
 import time
+import shlex
 import logging
+import subprocess
 import platform
+import threading
 
 import tarfile
 import zipfile
@@ -40,7 +48,8 @@ import gzip
 
 from os import PathLike
 from pathlib import Path
-from typing import Protocol, AnyStr, Optional, Union
+from contextlib import ExitStack
+from typing import Protocol, AnyStr, Optional, Union, IO
 # endregion
 
 
@@ -48,18 +57,39 @@ class SingletonMeta(type):
     """Metaclass implementing the Singleton pattern.
 
         Ensures that only one instance of a class is created.
+        An existing instance is returned with a single dictionary
+        lookup; the lock is taken only to construct a missing one.
     """
 
     _instances = {}
+    # Reentrant, so a singleton may construct another one in __init__
+    _lock = threading.RLock()
+    _missing = object()
 
     def __call__(cls, *args, **kwargs):
         """Returns the singleton instance of the class.
 
             Creates one if it does not exist.
         """
-        if cls not in cls._instances:
-            cls._instances[cls] = super().__call__(*args, **kwargs)
-        return cls._instances[cls]
+        instance = cls._instances.get(cls, cls._missing)
+        if instance is not cls._missing:
+            return instance
+
+        with cls._lock:
+            # Another thread may have built it while we were waiting
+            instance = cls._instances.get(cls, cls._missing)
+            if instance is cls._missing:
+                instance = super().__call__(*args, **kwargs)
+                cls._instances[cls] = instance
+        return instance
+
+    def set_instance(cls, instance) -> None:
+        """Registers an already constructed object as the singleton instance.
+
+            Used to restore a singleton inside worker processes,
+            where the instance arrives pickled from the parent process.
+        """
+        cls._instances[cls] = instance
 
 
 class LoggerMixin:
@@ -120,79 +150,306 @@ class ICommandExecutor(Protocol):
         """
 
 
+Stream = Optional[Union[PathLike[AnyStr], int, IO]]
+
+
 class CommandExecutor(LoggerMixin, ICommandExecutor):
-    """Executes system commands using a provided callable.
+    """Executes system commands using a provided callable
+        or, by default, directly with subprocess.
+
+        Commands given as a list of arguments are started without a shell.
+        Strings are passed to the shell, so they may still contain
+        pipes and redirections.
 
         Attributes:
-            caller (callable):
-                Function that executes commands, defaults to os.system.
+            caller (Optional[callable]):
+                Function that executes commands (e.g. os.system).
+                If None, commands are started with subprocess.Popen.
             logger (logging.Logger):
                 Logger instance for logging.
     """
 
     def __init__(
         self,
-        caller: callable = os.system,
+        caller: Optional[callable] = None,
         logger: Optional[logging.Logger] = None
     ):
         """Initializes the CommandExecutor.
 
             Args:
-                caller (callable):
+                caller (Optional[callable]):
                     Callable that executes commands.
+                    Defaults to None, which means subprocess.Popen.
                 logger (Optional[logging.Logger]):
                     Logger instance.
         """
         super().__init__(logger)
 
-        if callable(caller):
+        if caller is None or callable(caller):
             self.caller = caller
         else:
             raise TypeError(
                 "Command caller must be callable, "
                 f"'{type(caller)}' given")
 
-    def run(
+    def __call__(
         self,
-        command: Union[list[str], str, dict[str, str]]
-    ) -> bool:
-        """Executes the given command.
+        command: Union[list[str], str, dict[str, str]],
+        *,
+        stdout: Stream = None,
+        stderr: Stream = None,
+        background: bool = False,
+        check: bool = False
+    ) -> Union[subprocess.Popen, int]:
+        """Starts the given command.
 
             Args:
                 command (Union[list[str], str, dict[str, str]]):
                     Command to run.
+                stdout (Stream, optional):
+                    File path, descriptor or file object for stdout.
+                stderr (Stream, optional):
+                    File path, descriptor or file object for stderr.
+                    'subprocess.STDOUT' merges it into stdout.
+                background (bool):
+                    If True, returns the running process without waiting.
+                check (bool):
+                    If True, a non-zero exit status of a foreground command
+                    raises subprocess.CalledProcessError.
 
             Returns:
-                bool:
-                    True if command executed successfully, False otherwise.
+                Union[subprocess.Popen, int]:
+                    The process handle if 'background' is set,
+                    the exit code otherwise.
         """
-        if isinstance(command, list):
-            self.caller(' '.join(command))
-        elif isinstance(command, str):
-            self.caller(command)
-        elif isinstance(command, dict):
-            self.caller(' '.join(
+        if isinstance(command, dict):
+            command = ' '.join(
                 [f"{key} {value}" for (key, value) in command.items()])
-            )
+        elif not isinstance(command, (list, str)):
+            raise TypeError(f"Unsupported command type: {type(command)}")
+
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(
+                "'%s' got '%s' command as type '%s'",
+                self.__class__.__name__,
+                shlex.join(command) if isinstance(command, list)
+                else command, type(command))
+
+        if self.caller is not None:
+            if isinstance(command, list):
+                command = shlex.join(command)
+            if isinstance(stdout, (str, PathLike)):
+                command = ' '.join([command, '>', shlex.quote(str(stdout))])
+            if stderr == subprocess.STDOUT:
+                command = ' '.join([command, '2>&1'])
+            elif isinstance(stderr, (str, PathLike)):
+                command = ' '.join([command, '2>', shlex.quote(str(stderr))])
+
+            returncode = self.caller(command)
 
         else:
-            raise TypeError(f"Unsupported command type: {type(command)}")
+            with ExitStack() as stack:
+                # Only the child writes to the files, so they aren't
+                # buffered here. Streams redirected to the same path
+                # share one file instead of overwriting each other
+                opened = {}
+
+                def _open(stream):
+                    if not isinstance(stream, (str, PathLike)):
+                        return stream
+                    path = os.path.abspath(stream)
+                    if path not in opened:
+                        opened[path] = stack.enter_context(
+                            open(path, 'wb', buffering=0))
+                    return opened[path]
+
+                streams = [_open(stream) for stream in (stdout, stderr)]
+
+                # The child owns duplicates of the descriptors,
+                # so the files can be closed here even for background runs
+                process = subprocess.Popen(
+                    command,
+                    shell=isinstance(command, str),
+                    stdout=streams[0],
+                    stderr=streams[1])
+
+            if background:
+                return process
+
+            returncode = process.wait()
 
-        self.logger.debug(
-            "'%s' got '%s' command as type '%s'",
-            self.__class__.__name__,
-            str(command), type(command))
+        if check and returncode not in (None, os.EX_OK):
+            raise subprocess.CalledProcessError(returncode, command)
 
+        return returncode
+
+    def run(
+        self,
+        command: Union[list[str], str, dict[str, str]],
+        **kwargs
+    ) -> Union[subprocess.Popen, bool]:
+        """Executes the given command.
+
+            Args:
+                command (Union[list[str], str, dict[str, str]]):
+                    Command to run.
+                **kwargs:
+                    'stdout', 'stderr', 'background' and 'check'
+                    options passed to '__call__'.
+
+            Returns:
+                Union[subprocess.Popen, bool]:
+                    The process handle for background runs,
+                    otherwise True if command executed successfully,
+                    False otherwise.
+
+            Raises:
+                OSError:
+                    If the command couldn't be started and 'check' is set.
+        """
         try:
-            self.caller(command)
-            return True
+            result = self(command, **kwargs)
 
         except (OSError, SystemError, PermissionError, IOError) as e:
             self.logger.critical(e)
+            if kwargs.get('check', False):
+                raise
             return False
 
+        if isinstance(result, subprocess.Popen):
+            return result
+
+        if result not in (None, os.EX_OK):
+            self.logger.error(
+                "Command '%s' exited with status '%s'", command, result)
+            return False
+
+        return True
+
+    def pipe(
+        self,
+        commands: list[Union[list[str], str]],
+        *,
+        stdin: Stream = None,
+        stdout: Stream = None,
+        stderr: Optional[list[Stream]] = None,
+        check: bool = False
+    ) -> int:
+        """Runs commands connected by pipes, each one reading
+            the previous one's stdout, like 'cmd1 | cmd2 | ...' in a shell.
+
+            Args:
+                commands (list[Union[list[str], str]]):
+                    Commands of the pipeline in order.
+                stdin (Stream, optional):
+                    File path, descriptor or file object
+                    for the first command's stdin.
+                stdout (Stream, optional):
+                    File path, descriptor or file object
+                    for the last command's stdout.
+                stderr (list[Stream], optional):
+                    Stderr targets, one per command.
+                check (bool):
+                    If True, a failure of any command
+                    raises subprocess.CalledProcessError.
+
+            Returns:
+                int:
+                    The first non-zero exit status in the pipeline
+                    (as 'set -o pipefail' does), zero otherwise.
+        """
+        stderr = stderr or [None] * len(commands)
+
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(
+                "'%s' got '%s' pipeline",
+                self.__class__.__name__, ' | '.join(
+                    shlex.join(command) if isinstance(command, list)
+                    else command for command in commands))
+
+        if self.caller is not None:
+            parts = []
+            for command, err in zip(commands, stderr):
+                if isinstance(command, list):
+                    command = shlex.join(command)
+                if isinstance(err, (str, PathLike)):
+                    command = ' '.join([command, '2>', shlex.quote(str(err))])
+                parts.append(command)
+
+            # The redirection belongs to the first command, otherwise
+            # the shell would attach it to the last one
+            if isinstance(stdin, (str, PathLike)):
+                parts[0] = ' '.join([parts[0], '<', shlex.quote(str(stdin))])
+
+            pipeline = ' | '.join(parts)
+            if isinstance(stdout, (str, PathLike)):
+                pipeline = ' '.join([pipeline, '>', shlex.quote(str(stdout))])
+
+            returncode = self.caller(pipeline)
+            failed = commands if returncode not in (None, os.EX_OK) else None
+
+        else:
+            processes = []
+            with ExitStack() as stack:
+                # Outputs redirected to the same path share one file,
+                # as in '__call__', instead of overwriting each other
+                opened = {}
+
+                def _open(stream, mode):
+                    if not isinstance(stream, (str, PathLike)):
+                        return stream
+                    if mode == 'rb':
+                        return stack.enter_context(
+                            open(stream, mode, buffering=0))
+                    path = os.path.abspath(stream)
+                    if path not in opened:
+                        opened[path] = stack.enter_context(
+                            open(path, mode, buffering=0))
+                    return opened[path]
+
+                upstream = _open(stdin, 'rb')
+                for index, (command, err) in enumerate(zip(commands, stderr)):
+                    last = index == len(commands) - 1
 
-def execute(executor, command) -> None:
+                    try:
+                        process = subprocess.Popen(
+                            command,
+                            shell=isinstance(command, str),
+                            stdin=upstream,
+                            stdout=_open(stdout, 'wb') if last
+                            else subprocess.PIPE,
+                            stderr=_open(err, 'wb'))
+
+                    except OSError:
+                        # Nothing reads the started processes' output now,
+                        # so they are stopped instead of left hanging
+                        for started in processes:
+                            started.kill()
+                            if started.stdout is not None:
+                                started.stdout.close()
+                            started.wait()
+                        raise
+
+                    # Drop the parent's copy of the pipe, so the upstream
+                    # process gets SIGPIPE if the downstream one exits
+                    if processes:
+                        processes[-1].stdout.close()
+
+                    processes.append(process)
+                    upstream = process.stdout
+
+            returncode, failed = os.EX_OK, None
+            for process in processes:
+                if process.wait() != os.EX_OK and failed is None:
+                    returncode, failed = process.returncode, process.args
+
+        if check and failed is not None:
+            raise subprocess.CalledProcessError(returncode, failed)
+
+        return returncode
+
+
+def execute(executor, command, **kwargs) -> Union[subprocess.Popen, bool]:
     """Executes a command using the provided executor.
 
         Args:
@@ -200,13 +457,48 @@ def execute(executor, command) -> None:
                 Executor object or callable.
             command (Union[list[str], str, dict[str, str]]):
                 Command to execute.
+            **kwargs:
+                'stdout', 'stderr', 'background' and 'check' options.
+                A plain callable executor gets them as shell redirections
+                and always runs the command in the foreground.
+
+        Returns:
+            Union[subprocess.Popen, bool]:
+                The process handle for background runs
+                with a CommandExecutor, otherwise the execution status.
     """
     if hasattr(executor, 'run'):
-        executor.run(command)
-    elif callable(executor):
-        executor(command)
-    else:
-        raise TypeError(f"Unsupported executor type: {type(executor)}")
+        return executor.run(command, **kwargs)
+    if callable(executor):
+        return CommandExecutor(executor, logging.getLogger(__name__)).run(
+            command, **{k: v for k, v in kwargs.items() if k != 'background'})
+
+    raise TypeError(f"Unsupported executor type: {type(executor)}")
+
+
+def execute_pipeline(executor, commands, **kwargs) -> int:
+    """Executes commands connected by pipes using the provided executor.
+
+        Args:
+            executor (Union[ICommandExecutor, callable]):
+                Executor object or callable.
+            commands (list[Union[list[str], str]]):
+                Commands of the pipeline in order.
+            **kwargs:
+                'stdin', 'stdout', 'stderr' and 'check' options
+                of 'CommandExecutor.pipe'.
+
+        Returns:
+            int:
+                The first non-zero exit status in the pipeline, zero otherwise.
+    """
+    if hasattr(executor, 'pipe'):
+        return executor.pipe(commands, **kwargs)
+    if callable(executor) and not hasattr(executor, 'run'):
+        return CommandExecutor(
+            executor, logging.getLogger(__name__)).pipe(commands, **kwargs)
+
+    raise TypeError(f"Unsupported executor type: {type(executor)}")
 
 
 def touch(path: PathLike[AnyStr]) -> None:
@@ -220,6 +512,29 @@ def touch(path: PathLike[AnyStr]) -> None:
         os.utime(path, None)
 
 
+def outputs_exist(*paths: PathLike[AnyStr]) -> bool:
+    """Checks whether all the given files exist and aren't empty.
+
+        Stages use it to skip the commands whose outputs are left
+        by a previous run in the same output directory.
+        A file the stage writes last (e.g. an index) should be
+        among the paths, so an interrupted stage isn't skipped.
+
+        Args:
+            *paths (PathLike[AnyStr]):
+                Paths to the stage outputs.
+
+        Returns:
+            bool:
+                True if every file exists and isn't empty.
+    """
+    try:
+        return bool(paths) and all(
+            os.path.getsize(path) > 0 for path in paths)
+    except OSError:
+        return False
+
+
 def insert_processing_infix(
     infix_str: str,
     filename: PathLike[AnyStr]
@@ -11,7 +11,7 @@
 
     Main features:
         - Supports arguments for log file, output directory,
-        report language, number of threads,
+        report language, number of threads, samples in parallel,
         and flags for demultiplexor and table manager.
         - Provides a clear and extendable way to
         handle command-line inputs for the script.
@@ -27,6 +27,7 @@ import argparse
 from typing import Protocol
 
 from src.core.base import get_unique_path
+from src.core.configurator.config_loader import DEFAULT_CONFIG_FILEPATH
 
 
 class IArgumentParser(Protocol):
@@ -84,6 +85,12 @@ class ArgumentParser(IArgumentParser):
                 'type': int,
                 'default': 2,
                 'help': 'Number of threads'}},
+            {'name': ('--samples-in-parallel', '-sp'), 'kwargs': {
+                'dest': 'samplesInParallel',
+                'type': int,
+                'default': None,
+                'help': 'Number of samples prepared simultaneously. '
+                'Default is CPU count divided by the number of threads'}},
             {'name': ('--configuration', '-c'), 'kwargs': {
                 'dest': 'configFilepath',
                 'type': str,
@@ -113,8 +120,7 @@ class ArgumentParser(IArgumentParser):
             namespace.outputDir = get_unique_path()
 
         if namespace.configFilepath is None:
-            namespace.configFilepath = os.path.abspath(os.path.join(
-                os.curdir, 'src', 'conf', 'config.ini'
-            ))
+            namespace.configFilepath = os.path.abspath(
+                DEFAULT_CONFIG_FILEPATH)
 
         return namespace
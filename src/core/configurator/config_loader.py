@@ -17,6 +17,7 @@
         - Returns a dictionary containing configuration key-value pairs.
         - Raises `FileNotFoundError` if the configuration file does not exist.
         - Raises `ConfigurationError` if the section is missing or invalid.
+        - Parses every file once, until it is modified.
 
     Usage:
         Instantiate `ConfigLoader`, optionally passing a logger,
@@ -26,6 +27,7 @@
 # region Imports
 import os
 import logging
+import functools
 import configparser
 
 from os import PathLike
@@ -35,6 +37,39 @@ from src.core.base import LoggerMixin
 from src.core.configurator.configuration_error import ConfigurationError
 # endregion
 
+# Relative to the current directory, resolved when it is used
+DEFAULT_CONFIG_FILEPATH = os.path.join('src', 'conf', 'config.ini')
+
+
+@functools.lru_cache(maxsize=None)
+def _read_config(
+    config_filepath: PathLike[AnyStr],
+    mtime: float
+) -> configparser.ConfigParser:
+    """Parses an INI file.
+
+        Stages load their sections for every sample, so the parsed file
+        is cached. The modification time is a part of the cache key,
+        so an edited file is parsed again.
+
+        Args:
+            config_filepath (PathLike[AnyStr]):
+                Path to the configuration file.
+            mtime (float):
+                The file's modification time.
+
+        Returns:
+            configparser.ConfigParser:
+                The parsed file. It must not be modified.
+    """
+    conf = configparser.ConfigParser(
+        inline_comment_prefixes=[';', '#'],
+        comment_prefixes=[';', '#'])
+
+    conf.read(config_filepath)
+
+    return conf
+
 
 class IConfigLoader(Protocol):
     """Interface for configuration loader classes.
@@ -63,16 +98,15 @@ class ConfigLoader(LoggerMixin, IConfigLoader):
 
     def load(
         self,
-        base_config_filepath: Optional[PathLike[AnyStr]] = os.path.abspath(
-            os.path.join('src', 'conf', 'config.ini')
-        ),
+        base_config_filepath: Optional[PathLike[AnyStr]] = None,
         target_section: AnyStr = 'Pathes',
     ) -> dict:
         """Loads configuration from the specified INI file and section.
 
             Args:
-                base_config_filepath (PathLike):
+                base_config_filepath (PathLike, optional):
                     Path to the configuration file.
+                    Defaults to DEFAULT_CONFIG_FILEPATH.
                 target_section (str):
                     Section in the configuration file to load.
 
@@ -86,15 +120,16 @@ class ConfigLoader(LoggerMixin, IConfigLoader):
                 ConfigurationError:
                     if the section is missing or cannot be parsed.
         """
+        if base_config_filepath is None:
+            base_config_filepath = os.path.abspath(DEFAULT_CONFIG_FILEPATH)
+
         if (
             os.path.exists(base_config_filepath) and
             os.path.isfile(base_config_filepath)
         ):
-            conf = configparser.ConfigParser(
-                inline_comment_prefixes=[';', '#'],
-                comment_prefixes=[';', '#'])
-
-            conf.read(os.path.join(base_config_filepath))
+            conf = _read_config(
+                base_config_filepath,
+                os.path.getmtime(base_config_filepath))
 
             config_dict = {'target_section': target_section}
 
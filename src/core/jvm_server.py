@@ -0,0 +1,234 @@
+"""This module provides running Java tools in a single persistent JVM
+    with Nailgun instead of starting a fresh JVM for every invocation.
+
+    Main components include:
+        - java_options:
+            Builds the heap and garbage collector options
+            of the 'Java' section.
+        - java_command:
+            Builds the command prefix running a Java tool, either
+            with 'java -jar' or with the Nailgun client.
+        - NailgunServer:
+            Starts and stops the Nailgun server the client connects to.
+
+    Nailgun is used only if both 'nailgun-server' (the server jar)
+    and 'ng' (the client) are set in the 'Pathes' section.
+    The server keeps the JIT-compiled code of the tools warm
+    between the samples of a batch.
+
+    Note:
+        Every Java tool run through Nailgun has to be on the server's
+        class path and have its main class in 'NAILGUN_MAIN_CLASSES'.
+
+        The server installs a SecurityManager catching 'System.exit'
+        of the tools, which JDK 18 and later allow only with
+        '-Djava.security.manager=allow'. The option is accepted
+        since JDK 12, and JDK 24 has removed the SecurityManager,
+        so the server runs on JDK 12 to 23.
+"""
+
+# region Imports
+import os
+import time
+import subprocess
+
+from typing import Optional
+
+from src.configurator import Configurator
+
+from src.core.base import LoggerMixin
+from src.core.base import CommandExecutor
+from src.core.base import execute
+# endregion
+
+NAILGUN_MAIN_CLASS = 'com.facebook.nailgun.NGServer'
+
+# Lets the server install its SecurityManager on JDK 18 and later
+NAILGUN_JVM_OPTIONS = ['-Djava.security.manager=allow']
+
+# Main classes of the jars from the 'Pathes' section
+NAILGUN_MAIN_CLASSES = {
+    'trimmomatic': 'org.usadellab.trimmomatic.Trimmomatic',
+    'snpeff': 'org.snpeff.SnpEff',
+}
+
+
+def nailgun_enabled(configurator: Configurator) -> bool:
+    """Checks whether Java tools have to be run through Nailgun.
+
+        Args:
+            configurator (Configurator):
+                The configuration object.
+
+        Returns:
+            bool:
+                True if the Nailgun server and client are configured.
+    """
+    return bool(
+        configurator.config.get('nailgun-server')
+        and configurator.config.get('ng'))
+
+
+def java_options(configurator: Configurator) -> list[str]:
+    """Builds the JVM options of the 'Java' section.
+
+        The parallel collector is used instead of the default one
+        picked by the JVM, which may be the serial collector
+        for a small heap. The number of its threads defaults
+        to a half of '--threads'.
+
+        Args:
+            configurator (Configurator):
+                The configuration object.
+
+        Returns:
+            list[str]:
+                Options placed before '-jar' or the main class.
+    """
+    options = configurator.parse_optional_configuration(
+        'Java', defaults={
+            'heap': '',
+            'gc-threads': str(max(1, configurator.args.threads // 2))})
+
+    return [
+        *([f"-Xmx{options['heap']}"] if options['heap'] else []),
+        '-XX:+UseParallelGC',
+        f"-XX:ParallelGCThreads={options['gc-threads']}"]
+
+
+def java_command(configurator: Configurator, jar_key: str) -> list[str]:
+    """Builds the command prefix running the Java tool
+        whose jar is set by 'jar_key' in the 'Pathes' section.
+
+        Args:
+            configurator (Configurator):
+                The configuration object.
+            jar_key (str):
+                Option of the 'Pathes' section with the tool's jar.
+
+        Returns:
+            list[str]:
+                Either the Nailgun client with the tool's main class
+                or 'java -jar' with the tool's jar.
+                The tool's own arguments follow it.
+    """
+    if nailgun_enabled(configurator) and jar_key in NAILGUN_MAIN_CLASSES:
+        return [configurator.config['ng'], NAILGUN_MAIN_CLASSES[jar_key]]
+
+    return [
+        configurator.config['java'], *java_options(configurator),
+        '-jar', configurator.config[jar_key]]
+
+
+class NailgunServer(LoggerMixin):
+    """Nailgun server serving the Java tools of a batch.
+
+        Can be used as a context manager, which starts the server
+        on enter and stops it on exit.
+
+        Attributes:
+            configurator (Configurator):
+                The configuration object.
+            executor (CommandExecutor):
+                The executor starting the server in the background.
+    """
+
+    def __init__(
+        self,
+        configurator: Configurator,
+        executor: CommandExecutor,
+        startup_timeout: float = 30.0
+    ):
+        """Initializes the server without starting it.
+
+            Args:
+                configurator (Configurator):
+                    The configuration object.
+                executor (CommandExecutor):
+                    The executor starting the server in the background.
+                startup_timeout (float, optional):
+                    Seconds to wait for the server to accept connections.
+        """
+        super().__init__(logger=configurator.logger)
+        self.configurator = configurator
+        self.executor = executor
+        self._startup_timeout = startup_timeout
+        self._process: Optional[subprocess.Popen] = None
+
+    def start(self) -> None:
+        """Starts the server with every configured tool
+            on its class path and waits until it accepts connections.
+
+            Raises:
+                RuntimeError:
+                    If the executor can't run background commands
+                    or the server hasn't started in time.
+        """
+        if self.executor.caller is not None:
+            raise RuntimeError(
+                "Nailgun server can't be started in the background "
+                "by a custom command caller")
+
+        config = self.configurator.config
+        classpath = os.pathsep.join([config['nailgun-server'], *[
+            config[key] for key in NAILGUN_MAIN_CLASSES if config.get(key)]])
+
+        log_path = os.path.join(self.configurator.output_dir, 'nailgun.log')
+
+        self._process = execute(
+            self.executor,
+            [config['java'], *java_options(self.configurator),
+             *NAILGUN_JVM_OPTIONS, '-cp', classpath, NAILGUN_MAIN_CLASS],
+            stdout=log_path, stderr=subprocess.STDOUT, background=True)
+
+        if not isinstance(self._process, subprocess.Popen):
+            raise RuntimeError(
+                f"Nailgun server can't be started. See '{log_path}'")
+
+        deadline = time.monotonic() + self._startup_timeout
+        while not self._ping():
+            if self._process.poll() is not None \
+                    or time.monotonic() > deadline:
+                self.stop()
+                raise RuntimeError(
+                    f"Nailgun server hasn't started. See '{log_path}'")
+            time.sleep(0.5)
+
+        self.logger.info(
+            "Nailgun server started with pid %s", self._process.pid)
+
+    def stop(self) -> None:
+        """Stops the server if it's running."""
+        if self._process is None:
+            return
+
+        if self._process.poll() is None:
+            execute(
+                self.executor, [self.configurator.config['ng'], 'ng-stop'],
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            try:
+                self._process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+                self._process.wait()
+
+        self._process = None
+
+    def _ping(self) -> bool:
+        """Checks whether the server accepts connections."""
+        # The executor is called directly, since refused connections
+        # are expected while the server is starting and aren't errors
+        try:
+            return self.executor(
+                [self.configurator.config['ng'], 'ng-version'],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL) == os.EX_OK
+        except OSError:
+            return False
+
+    def __enter__(self) -> 'NailgunServer':
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
@@ -2,15 +2,17 @@
     sample-related data paths and identifiers.
 
     It includes attributes for R1 and R2 file paths,
-    sample identifiers, and processing log paths.
+    sample identifiers, and processing log paths,
+    and a dataclass with the paths derived from them.
 """
 
 # region Imports
 import os
-import re
 import logging
+import datetime
 
 from os import PathLike
+from dataclasses import dataclass
 from typing import Optional
 from typing import AnyStr
 
@@ -48,6 +50,80 @@ _alias_map = {
 }
 
 
+@dataclass(frozen=True, slots=True)
+class SamplePaths:
+    """Paths of the per-sample files named after the sample identifier.
+
+        Directories are absolute, so the stages can join
+        file names to them without resolving them again.
+
+        Attributes:
+            processing_dir (PathLike[AnyStr]):
+                Absolute sample's processing directory.
+            logdir (PathLike[AnyStr]):
+                Absolute sample's log directory.
+            trimmed_reads_dir (PathLike[AnyStr]):
+                Directory of the adapter-trimmed reads.
+            header_sam (PathLike[AnyStr]):
+                Header-only SAM file of the sample's BAM file.
+            convert2annovar_log (PathLike[AnyStr]):
+                Log of convert2annovar.
+            table_annovar_log (PathLike[AnyStr]):
+                Log of table_annovar.
+            ann_prefix (PathLike[AnyStr]):
+                Output prefix of table_annovar.
+            multianno_txt (PathLike[AnyStr]):
+                Annotation table written by table_annovar.
+    """
+    processing_dir: PathLike[AnyStr]
+    logdir: PathLike[AnyStr]
+    trimmed_reads_dir: PathLike[AnyStr]
+    header_sam: PathLike[AnyStr]
+    convert2annovar_log: PathLike[AnyStr]
+    table_annovar_log: PathLike[AnyStr]
+    ann_prefix: PathLike[AnyStr]
+    multianno_txt: PathLike[AnyStr]
+
+    @classmethod
+    def build(
+        cls,
+        processing_path: PathLike[AnyStr],
+        processing_logpath: PathLike[AnyStr],
+        sid: str,
+        reference_ident: str = 'hg19'
+    ) -> 'SamplePaths':
+        """Joins all the paths at once.
+
+            Args:
+                processing_path (PathLike[AnyStr]):
+                    Sample's processing directory.
+                processing_logpath (PathLike[AnyStr]):
+                    Sample's log directory.
+                sid (str):
+                    Sample identifier.
+                reference_ident (str, optional):
+                    Reference build used by table_annovar.
+
+            Returns:
+                SamplePaths:
+                    The sample's paths.
+        """
+        processing_dir = os.path.abspath(processing_path)
+        logdir = os.path.abspath(processing_logpath)
+        ann_prefix = os.path.join(processing_dir, sid+'.ann')
+
+        return cls(
+            processing_dir=processing_dir,
+            logdir=logdir,
+            trimmed_reads_dir=os.path.join(processing_dir, 'trimmed_reads'),
+            header_sam=os.path.join(processing_dir, sid+'.header.sam'),
+            convert2annovar_log=os.path.join(logdir, 'convert2annovar.log'),
+            table_annovar_log=os.path.join(logdir, 'table_annovar.log'),
+            ann_prefix=ann_prefix,
+            multianno_txt=os.path.abspath(
+                f"{ann_prefix}.{reference_ident}_multianno.txt"))
+
+
 class SampleDataContainer:
     """A container class for storing sample-related data paths and identifiers.
 
@@ -64,13 +140,15 @@ class SampleDataContainer:
             vcf_filepath (Optional[PathLike[AnyStr]]):
                 Path to VCF file (optional).
             report_path (PathLike[AnyStr]): Path to the report directory.
+            paths (SamplePaths):
+                Paths derived from the processing paths and identifier.
         """
 
     __slots__ = [
         'r1_source', 'r2_source', 'sid',
         'processing_path', 'processing_logpath',
         'target_regions', 'bam_filepath', 'vcf_filepath',
-        'report_path'
+        'report_path', '_paths'
     ]
 
     def __init__(
@@ -127,18 +205,58 @@ class SampleDataContainer:
 
         self.bam_filepath, self.vcf_filepath = bam_filepath, vcf_filepath
 
+        self._paths = None
+
+    @property
+    def paths(self) -> SamplePaths:
+        """Paths derived from the processing paths and identifier,
+            joined on the first access.
+        """
+        if self._paths is None:
+            self._paths = SamplePaths.build(
+                self.processing_path, self.processing_logpath, self.sid)
+        return self._paths
+
+    def read_group_fields(self) -> list[str]:
+        """Builds the fields of the sample's read group.
+
+            Returns:
+                list[str]:
+                    'TAG:value' fields, the ID goes first.
+        """
+        return [
+            f"ID:{self.sid}",
+            f"DT:{datetime.date.today()}",
+            'LB:MiSeq',
+            'PL:Illumina',
+            'PU:barcode',
+            f"SM:{self.sid}"]
+
+    def read_group_line(self) -> str:
+        """Builds the sample's '@RG' header line with escaped tabs,
+            as the aligner's '-R' option takes it.
+
+            Returns:
+                str:
+                    The header line.
+        """
+        return '\\t'.join(['@RG', *self.read_group_fields()])
+
     def parse_regions(
         self,
         configurator: Configurator,
         path: PathLike[AnyStr] = None,
-        logger: logging.Logger = None
+        logger: logging.Logger = None,
+        regions: Optional[dict[str, tuple[str, str]]] = None
     ):
         """Parses target regions from a SAM file
             and updates the object's target_regions attribute.
 
-            This method reads a SAM file (defaulting to a path
+            This method reads the header of a SAM file (defaulting to a path
             based on the object's processing_path and sid) and extracts
             chromosome information from sequence headers (@SQ lines).
+            A header-only SAM file (e.g. 'samtools view -H' output)
+            is enough.
             It formats the chromosome identifiers into interval
             strings (e.g., 'chr01-interval') and generates corresponding region
             tuples using the provided configurator.
@@ -153,6 +271,10 @@ class SampleDataContainer:
                 logger (logging.Logger, optional):
                     Logger for logging critical errors encountered
                     during file processing.
+                regions (dict[str, tuple[str, str]], optional):
+                    Precomputed region tuples keyed by lowercased
+                    interval name (see 'reg_tuple_map'). If None,
+                    the configuration is parsed for every interval.
 
             Raises:
                 FileNotFoundError, PermissionError, IOError, OSError:
@@ -172,8 +294,15 @@ class SampleDataContainer:
                 mode='r',
                 encoding='utf-8'
             ) as fd:
-                for region in re.finditer(r"@SQ.*\n", fd.read()):
-                    sn_field = region.group().split('\t')[1].strip()
+                for line in fd:
+                    # Only the header is needed, so stop at the first record
+                    # instead of reading the whole alignment into memory
+                    if not line.startswith('@'):
+                        break
+                    if not line.startswith('@SQ'):
+                        continue
+
+                    sn_field = line.split('\t', 2)[1].strip()
 
                     sn_value = sn_field.split(':')[1]
 
@@ -190,12 +319,16 @@ class SampleDataContainer:
             self.target_regions = tuple(filter(
                 (lambda x: x),
                 [
-                    reg_tuple_generator(configurator, interval)
+                    regions.get(interval.lower()) if regions is not None
+                    else reg_tuple_generator(configurator, interval)
                     for interval in target_chromosomes
                 ]
             ))
 
-            print(self.target_regions)
+            if logger is not None:
+                logger.debug(
+                    "Sample '%s' target regions: %s",
+                    self.sid, self.target_regions)
 
         except (FileNotFoundError, PermissionError, IOError, OSError) as e:
             if logger is not None:
@@ -1,8 +1,6 @@
 """Module for demultiplexor adapter functionality."""
 
 # region Imports
-import os
-
 from src.configurator import Configurator
 from src.utils.demultiplexor_adapter.demultiplexor_adapter_factory import (
     DemultiplexorAdapterFactory)
@@ -18,8 +16,7 @@ def main():
         adapter_type_name="BclToFastqAdapter",
         config=Configurator().parse_configuration(
             target_section='DemultiplexorAdapter'),
-        logger=Configurator().logger,
-        caller=os.system)
+        logger=Configurator().logger)
 
     demultiplexor_adapter.demultiplex()
 
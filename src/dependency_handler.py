@@ -22,6 +22,7 @@ Usage:
 import os
 import sys
 import logging
+import subprocess
 
 from os import PathLike
 from typing import Optional, AnyStr
@@ -136,11 +137,13 @@ class DependencyHandler(metaclass=SingletonMeta):
                     "Extraction has successfully done. "
                     "Path%s to extracted fil%s: ",
                     ending, 'e'+ending[-1])
-                self.logger.debug(
-                    f"{archive_file_names[0] if files_count == 1 else
-                        archive_file_names[0]+', '.join(
-                            archive_file_names[1:-2])+archive_file_names[-1]}"
-                )
+                if self.logger.isEnabledFor(logging.DEBUG):
+                    self.logger.debug(
+                        f"{archive_file_names[0] if files_count == 1 else
+                            archive_file_names[0]+', '.join(
+                                archive_file_names[1:-2]
+                            )+archive_file_names[-1]}"
+                    )
 
                 return list(map(
                     os.path.abspath, archive_file_names))
@@ -272,7 +275,10 @@ class DependencyHandler(metaclass=SingletonMeta):
 
         if not DependencyHandler.is_module_loaded(module_name):
             try:
-                if os.system(f'pip install {module_name}') == os.EX_OK:
+                if subprocess.run(
+                    [sys.executable, '-m', 'pip', 'install', module_name],
+                    check=False
+                ).returncode == os.EX_OK:
                     logger.info(
                         "The module '%s' has been successfully installed",
                         module_name)
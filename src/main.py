@@ -4,8 +4,6 @@
 """Main module for the data analysis pipeline."""
 
 # region Imports
-import os
-
 from src.configurator import Configurator
 from src.analyzer import BRCAAnalyzer
 from src.core.sample_data_factory import SampleDataFactory
@@ -27,10 +25,7 @@ def main():
     configurator = Configurator()
     main_logger = configurator.logger
 
-    brca1_analyzer = BRCAAnalyzer(
-        configurator=configurator,
-        cmd_caller=os.system
-    )
+    brca1_analyzer = BRCAAnalyzer(configurator=configurator)
 
     if configurator.args.table_manager_flag:
         table_manager.main()
@@ -48,6 +43,8 @@ def main():
         target_section='TableManager')
 
     if 'dump-file' in tm_config:
+        samples = []
+
         with open(tm_config['dump-file'], 'r', encoding='utf-8') as dump_fd:
             for dump_string in dump_fd.readlines():
                 sample_id = dump_string.split(';')[0].strip()
@@ -60,16 +57,12 @@ def main():
                         f"Skip '{sample_id.strip()}' sample")
                     continue
 
-                try:
-                    brca1_analyzer.prepare_data(sample)
-
-                except Exception as e:
-                    main_logger.critical(e)
-                    raise e
-
-                brca1_analyzer.analyze(sample)
+                samples.append(sample)
 
-                report_aggregator.aggregate_report(sample=sample)
+        for sample in brca1_analyzer.run_batch(
+            samples, max_workers=configurator.args.samplesInParallel
+        ):
+            report_aggregator.aggregate_report(sample=sample)
 
     else:
         runtime_error_msg = (
@@ -11,13 +11,13 @@ command construction, \
 and execution of the bcl2fastq command.
 """
 
-import os
 import logging
 
 from os import PathLike
 from typing import Optional, AnyStr
 
 from src.core.base import LoggerMixin
+from src.core.base import CommandExecutor
 from src.core.base import execute
 
 from src.core.configurator.configuration_error import ConfigurationError
@@ -50,11 +50,16 @@ class BclToFastqAdapter(LoggerMixin, IDemultiplexorAdapter):
     def __init__(
         self,
         config: dict[str, str],
-        cmd_caller: Optional[callable] = os.system,
+        cmd_caller: Optional[callable] = None,
         logger: logging.Logger = None
     ):
         super().__init__()
 
+        # Commands are argv lists, so by default they are run
+        # with subprocess and no shell has to parse them
+        if cmd_caller is None:
+            cmd_caller = CommandExecutor(logger=logger)
+
         if not callable(cmd_caller):
             msg = f"'cmd_caller' should be callable, got {type(cmd_caller)}"
             if logger:
@@ -216,7 +221,7 @@ class BclToFastqAdapter(LoggerMixin, IDemultiplexorAdapter):
 
         _ = [print(arg) for arg in cmd_args]
 
-        execute(self.cmd_caller, ' '.join(cmd_args))
+        execute(self.cmd_caller, cmd_args)
 
     def extract_barcodes(
         self,
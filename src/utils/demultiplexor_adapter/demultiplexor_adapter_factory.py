@@ -4,9 +4,8 @@ demultiplexor adapters.
 It handles the creation and selection logic,
 abstracting away the specific implementation details.
 """
-from typing import Union, TypeVar, Generic
+from typing import Union, Optional, TypeVar, Generic
 import logging
-import os
 
 from src.utils.demultiplexor_adapter.i_demultiplexor_adapter import \
     IDemultiplexorAdapter
@@ -45,7 +44,7 @@ class DemultiplexorAdapterFactory(LoggerMixin, Generic[T]):
         adapter_type_name: str,
         config: dict[str, str],
         logger: logging.Logger = None,
-        caller: Union[CommandExecutor, callable] = os.system
+        caller: Optional[Union[CommandExecutor, callable]] = None
     ) -> IDemultiplexorAdapter:
         """Creates a demultiplexor adapter based on the provided type name.
 
@@ -75,7 +74,7 @@ class DemultiplexorAdapterFactory(LoggerMixin, Generic[T]):
         adapter_type_name: str,
         config: dict[str, str],
         logger: logging.Logger = None,
-        caller: Union[CommandExecutor, callable] = os.system
+        caller: Optional[Union[CommandExecutor, callable]] = None
     ) -> IDemultiplexorAdapter:
         """Retrieve an instance of a demultiplexor adapter
         matching the specified type name.
@@ -97,7 +96,8 @@ class DemultiplexorAdapterFactory(LoggerMixin, Generic[T]):
                 Defaults to None.
             caller (Union[CommandExecutor, callable], optional):
                 Callable used by the adapter for execution purposes.
-                Defaults to `os.system`.
+                Defaults to None, which runs commands
+                with subprocess, without a shell.
 
         Returns:
             IDemultiplexorAdapter:
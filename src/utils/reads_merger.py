@@ -31,6 +31,7 @@ r"""FAST(A|Q) Reads Merger.
 import os
 import sys
 import re
+import subprocess
 
 from os import PathLike
 from typing import AnyStr
@@ -139,23 +140,22 @@ def merge_fastq(
                         f"{sample}_{file[file.index('R'):]}" for file in files
                     ]
 
-                    cmd = ' '.join([
-                        'cat', ' '.join([os.path.join(
-                            path, file) for file in files]),
-                        '>',
-                        os.path.abspath(os.path.join(
-                            outpath,
-                            f"{sample}_{'R1' if 'R1' in cat_list[0] else 'R2'}"
-                            ".fastq.gz"
-                        ))
-                    ])
+                    merged_filepath = os.path.abspath(os.path.join(
+                        outpath,
+                        f"{sample}_{'R1' if 'R1' in cat_list[0] else 'R2'}"
+                        ".fastq.gz"
+                    ))
 
-                    os.system(cmd)
+                    with open(merged_filepath, 'wb') as fd:
+                        subprocess.run(
+                            ['cat', *[
+                                os.path.join(path, file) for file in files]],
+                            stdout=fd, check=False)
 
                 elif len(files) == 1:
-                    cmd = ' '.join([
-                        'cp', os.path.join(path, files[0]), outpath])
-                    os.system(cmd)
+                    subprocess.run(
+                        ['cp', os.path.join(path, files[0]), outpath],
+                        check=False)
 
     except re.PatternError:
         print(error_msg)
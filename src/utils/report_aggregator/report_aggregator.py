@@ -9,7 +9,7 @@
 
     Main functionalities:
         - Parses configuration to determine target genomic regions.
-        - Performs coverage analysis on specified regions.
+        - Piles up the reads at the variant positions of the regions.
         - Reads variant annotation data from a text file.
         - Extracts relevant variant and annotation details.
         - Calculates coverage metrics for each variant.
@@ -37,15 +37,16 @@
 
 # region Imports
 import os
+import logging
 
-from statistics import mean
-
+import numpy
 import pandas
 
 from src.core.analyzer.amplicon_coverage_computer import \
     AmpliconCoverageDataPreparator
 from src.core.sample_data_container import SampleDataContainer
 from src.configurator import Configurator
+from src.core.base import CommandExecutor
 
 from src.utils.report_aggregator.i_report_data_container import \
     IReportDataContainer
@@ -243,9 +244,7 @@ def aggregate_report(sample: SampleDataContainer = None):
     """
     logger = Configurator().logger
 
-    txt_path = os.path.abspath(os.path.join(
-        sample.processing_path, sample.sid+".ann.hg19_multianno.txt"
-    ))
+    txt_path = sample.paths.multianno_txt
 
     if not os.path.exists(sample.report_path):
         os.makedirs(sample.report_path)
@@ -254,23 +253,40 @@ def aggregate_report(sample: SampleDataContainer = None):
         f"Starting to perform report aggregation for sample {sample.sid}"
     )
 
-    logger.debug(
-        "Report aggregator configuration:\n"
-        "Target regions:\n\t(Region, mpileup filepath): "
-        f"""{'\n\t(Region, mpileup filepath): '.join([
-            f"({regions_data})" for regions_data in sample.target_regions
-        ])}\n"""
-    )
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "Report aggregator configuration:\n"
+            "Target regions:\n\t(Region, mpileup filepath): "
+            f"""{'\n\t(Region, mpileup filepath): '.join([
+                f"({regions_data})" for regions_data in sample.target_regions
+            ])}\n"""
+        )
 
     preparator = AmpliconCoverageDataPreparator(
-        Configurator(), filter_func=mean
+        Configurator(), filter_func=numpy.mean
     )
-    preparator.perform(sample, os.system)
+
+    # Only the variant positions are piled up, the report doesn't need
+    # the coverage of the whole regions
+    if sample.target_regions is not None:
+        with open(file=txt_path, mode='r', encoding='utf-8') as fd:
+            next(fd, None)
+            sites = [
+                (variant.chromosome, variant.start)
+                for variant in (
+                    parse_variant_section(line.split(";ANN=")[0])
+                    for line in fd if ";ANN=" in line)]
+
+        preparator.generate_mpileup_at_sites(
+            sample, sites, CommandExecutor(logger=logger))
 
     report_list = []
 
     with open(file=txt_path, mode='r', encoding='utf-8') as fd:
-        for line in fd.readlines()[1:]:
+        # The table is streamed line by line instead of being read
+        # into memory as a whole, skipping the header
+        next(fd, None)
+        for line in fd:
             if ";ANN=" in line:
                 depth, alt_count, alt_coverage = 0, 0, 0
 
@@ -6,6 +6,10 @@
             Generates a tuple containing a region identifier
             and the corresponding mpileup file path
             based on a given configuration and chromosome interval.
+        - reg_tuple_map:
+            Generates such tuples for every configured interval at once.
+        - write_regions_bed:
+            Writes the configured intervals to a BED file.
 
     Dependencies:
         - src.configurator.Configurator:
@@ -28,6 +32,19 @@ from src.configurator import Configurator
 # endregion
 
 
+def _reg_tuple(regions_section: dict, chr_interval: str) -> tuple[str, str]:
+    """Build a (region, mpileup_filepath) tuple from the 'Regions' section."""
+    if str(chr_interval).lower() in regions_section:
+        return (
+            regions_section[
+                str(chr_interval).lower()
+            ].replace('chr', '').strip(),
+            f"mpileup{chr_interval[3:5]}"
+        )
+    else:
+        return None
+
+
 def reg_tuple_generator(
     configurator: Configurator,
     chr_interval: str
@@ -38,15 +55,77 @@ def reg_tuple_generator(
         base_config_filepath=configurator.args.configFilepath,
         target_section='Regions')
 
-    if str(chr_interval).lower() in regions_section:
-        return (
-            regions_section[
-                str(chr_interval).lower()
-            ].replace('chr', '').strip(),
-            f"mpileup{chr_interval[3:5]}"
-        )
-    else:
-        return None
+    return _reg_tuple(regions_section, chr_interval)
+
+
+def reg_tuple_map(configurator: Configurator) -> dict[str, tuple[str, str]]:
+    """Generate (region, mpileup_filepath) tuples for all configured intervals.
+
+        The 'Regions' section is parsed only once, so the result can be
+        computed up front and reused for every sample.
+
+        Returns:
+            dict[str, tuple[str, str]]:
+                Tuples keyed by the lowercased interval name.
+    """
+    regions_section = configurator.parse_configuration(
+        base_config_filepath=configurator.args.configFilepath,
+        target_section='Regions')
+
+    return {
+        str(chr_interval).lower(): _reg_tuple(regions_section, chr_interval)
+        for chr_interval in regions_section
+    }
+
+
+def write_regions_bed(
+    configurator: Configurator,
+    bed_filepath: PathLike[AnyStr],
+    reference_index: Optional[PathLike[AnyStr]] = None
+) -> PathLike[AnyStr]:
+    """Write the intervals of the 'Regions' section to a BED file.
+
+        Tools like GATK load a BED file into their interval structures
+        directly, which keeps command lines short however many
+        intervals are configured.
+
+        Args:
+            configurator (Configurator):
+                The configuration with a 'Regions' section.
+            bed_filepath (PathLike[AnyStr]):
+                Path to the output BED file.
+            reference_index (PathLike[AnyStr], optional):
+                Path to the reference '.fai' index. If it exists,
+                intervals on contigs absent from the reference are skipped,
+                since GATK rejects them.
+
+        Returns:
+            PathLike[AnyStr]:
+                Path to the written BED file.
+    """
+    regions_section = configurator.parse_configuration(
+        base_config_filepath=configurator.args.configFilepath,
+        target_section='Regions')
+
+    contigs = None
+    if reference_index is not None and os.path.exists(reference_index):
+        with open(reference_index, 'r', encoding='utf-8') as fd:
+            contigs = {line.split('\t', 1)[0] for line in fd}
+
+    with open(bed_filepath, 'w', encoding='utf-8') as fd:
+        for key, interval in regions_section.items():
+            if not key.endswith('-interval'):
+                continue
+
+            contig, span = interval.strip().rsplit(':', 1)
+            if contigs is not None and contig not in contigs:
+                continue
+
+            start, end = span.split('-')
+            # BED intervals are 0-based and half-open
+            fd.write(f"{contig}\t{int(start) - 1}\t{end}\n")
+
+    return bed_filepath
 
 
 def depth_filter(
@@ -83,14 +162,17 @@ def depth_filter(
             depth_filter('data.txt', depth=15)
     """
     try:
+        # Lines are filtered as bytes, so they are never decoded,
+        # and only the fields up to the depth are split off.
+        # Large buffers cut the number of read and write calls
         with open(
-            file=filepath, mode='r', encoding='utf-8'
+            file=filepath, mode='rb', buffering=1 << 20
         ) as fd, tempfile.NamedTemporaryFile(
-            mode='w', delete=False, encoding='utf-8',
+            mode='wb', buffering=1 << 20, delete=False,
             dir=os.path.dirname(filepath)
         ) as temp_fd:
             for line in fd:
-                fields = line.strip().split()
+                fields = line.split(b'\t', 4)
 
                 if len(fields) < 4:
                     continue
@@ -103,7 +185,7 @@ def depth_filter(
                 except (ValueError, IndexError) as e:
                     msg = f"An error '{repr(e)}' occurred at line " \
                           f"'{e.__traceback__.tb_frame.f_lineno}'. " \
-                          f"Skip the line '{line}'"
+                          f"Skip the line '{line.decode(errors='replace')}'"
 
                     if logger:
                         logger.warning(msg)